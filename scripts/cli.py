@@ -0,0 +1,262 @@
+"""
+서울시 주차장/상권 데이터 파이프라인 CLI
+
+사용 예:
+    python scripts/cli.py status                 # 환경 변수 / Elasticsearch 연결 상태 확인
+    python scripts/cli.py status --profile       # + 무거운 의존성 import 시간 리포트
+    python scripts/cli.py fetch parking          # 수집 + 필터링만 (업로드 없음, dry run)
+    python scripts/cli.py upload parking         # 수집 → 전처리 → 스풀 기록 → Elasticsearch 전송
+    python scripts/cli.py drain                  # 스풀에 남은 문서를 Elasticsearch 로 전송
+    python scripts/cli.py bench imports          # 의존성별 콜드 import 시간 측정
+    python scripts/cli.py bench ingest --fake    # 가짜 ES 대상 색인 처리량 한계 측정
+    python scripts/cli.py bench spatial          # 반경 검색 프로세스 수별 확장성 측정
+
+이 파일은 표준 라이브러리만 최상단에서 import 한다.
+pandas, elasticsearch 등은 각 서브커맨드가 실제로 실행될 때만 불러온다.
+"""
+import argparse
+import os
+import sys
+import time
+
+_START = time.perf_counter()
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+ES_URL = "http://localhost:9200"
+
+# upload / drain 후 스풀에 ES 로 보내지 못한 문서가 남아 있을 때의 종료 코드 (EX_TEMPFAIL)
+EXIT_BACKLOG = 75
+
+# import 시간이 큰 의존성 목록 (status --profile / bench imports 에서 측정)
+HEAVY_MODULES = [
+    "pandas",
+    "requests",
+    "geopy.distance",
+    "holidays",
+    "dotenv",
+    "elasticsearch",
+    "pytz",
+]
+
+
+## 1. import 시간 프로파일
+def profile_imports(modules=HEAVY_MODULES):
+    """
+    모듈별 콜드 import 시간을 측정 (python -X importtime 을 별도 프로세스로 실행)
+
+    Returns:
+        list of (module, cumulative_us or None): 설치되지 않은 모듈은 None
+    """
+    import subprocess
+
+    results = []
+    for module in modules:
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            results.append((module, None))
+            continue
+
+        # "import time:  self [us] | cumulative | imported package" 형식
+        cumulative = None
+        for line in proc.stderr.splitlines():
+            parts = line.split("|")
+            if len(parts) == 3 and parts[2].strip() == module:
+                cumulative = int(parts[1].strip())
+        results.append((module, cumulative))
+    return results
+
+
+def print_import_profile(results):
+    print("[import 시간 프로파일] (콜드 import, 모듈별 별도 프로세스)")
+    total = 0
+    for module, us in sorted(results, key=lambda r: -(r[1] or 0)):
+        if us is None:
+            print(f"  {module:<16} 미설치")
+            continue
+        total += us
+        print(f"  {module:<16} {us / 1000:8.1f} ms")
+    print(f"  {'합계':<14} {total / 1000:8.1f} ms")
+
+
+def loaded_heavy_modules():
+    return [m for m in HEAVY_MODULES if m in sys.modules]
+
+
+## 2. 서브커맨드
+def cmd_status(args):
+    import json
+    import urllib.request
+
+    # 2-1. API 키 설정 여부 (.env 는 dotenv 없이 직접 읽는다)
+    env = dict(os.environ)
+    env_path = os.path.join(os.path.dirname(SCRIPTS_DIR), ".env")
+    if os.path.exists(env_path):
+        with open(env_path, encoding="utf-8") as f:
+            for line in f:
+                key, sep, value = line.strip().partition("=")
+                if sep and not key.startswith("#"):
+                    env.setdefault(key.strip(), value.strip())
+
+    for key in ("API_KEY", "KAKAO_API_KEY"):
+        print(f"{key:<14}: {'설정됨' if env.get(key) else '없음'}")
+
+    # 2-2. Elasticsearch 연결 상태
+    try:
+        with urllib.request.urlopen(f"{ES_URL}/_cluster/health", timeout=args.timeout) as res:
+            health = json.loads(res.read())
+        print(f"Elasticsearch : {health.get('status')} ({ES_URL})")
+    except Exception as e:
+        print(f"Elasticsearch : 연결 실패 ({ES_URL}) / {e}")
+
+    # 2-3. 스풀에 남아 있는 (아직 ES 로 전송되지 않은) 문서 (읽기 전용 조회, 디렉토리를 만들지 않음)
+    from spool import read_backlog
+
+    segments, docs, dead_letters = read_backlog()
+    print(f"스풀 대기     : 세그먼트 {segments}개 / 문서 {docs}건 / 색인 불가(dead-letter) {dead_letters}건")
+
+    if args.profile:
+        print_import_profile(profile_imports())
+
+    heavy = loaded_heavy_modules()
+    print(f"로드된 무거운 모듈: {', '.join(heavy) if heavy else '없음'}")
+    print(f"CLI 실행 시간: {(time.perf_counter() - _START) * 1000:.1f} ms")
+
+
+def cmd_fetch(args):
+    import utils
+
+    if args.target == "parking":
+        df = utils.filter_valid_parking(utils.fetch_parking_data())
+        print(f"유효 주차장 데이터: {len(df)}건")
+    else:
+        summary_df, categories_df = utils.fetch_commercial_data()
+        print(f"상권 요약: {len(summary_df)}건 / 업종별 상세: {len(categories_df)}건")
+
+
+def check_backlog():
+    """스풀에 남은 문서가 있으면 경고를 출력하고 EXIT_BACKLOG 반환 (없으면 None → 종료 코드 0)"""
+    from spool import read_backlog
+
+    segments, docs, _ = read_backlog()
+    if docs:
+        print(f"[BACKLOG] Elasticsearch 미전송 문서 {docs}건 (세그먼트 {segments}개)이 스풀에 남아 있습니다.")
+        return EXIT_BACKLOG
+    return None
+
+
+def cmd_upload(args):
+    targets = ["parking", "commercial"] if args.target == "all" else [args.target]
+    for target in targets:
+        started = time.perf_counter()
+        if target == "parking":
+            import upload_parking_data
+
+            upload_parking_data.main()
+        else:
+            import upload_commercial_data
+
+            upload_commercial_data.main(workers=args.workers)
+        print(f"[{target}] 완료: {time.perf_counter() - started:.1f}s")
+    return check_backlog()
+
+
+def cmd_drain(args):
+    from spool import Spool, drain_spool
+
+    drain_spool(Spool())
+    return check_backlog()
+
+
+def cmd_bench_imports(args):
+    print_import_profile(profile_imports())
+    started = time.perf_counter()
+    import utils  # noqa: F401
+    print(f"utils 모듈 import: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+def cmd_bench_ingest(args):
+    from ingest import FakeElasticsearch, run_load_test
+
+    if args.fake:
+        es = FakeElasticsearch(capacity=args.fake_capacity)
+        print(f"[부하 테스트] 가짜 ES (처리 용량 {args.fake_capacity} docs/s)")
+    else:
+        from elasticsearch import Elasticsearch
+
+        es = Elasticsearch(ES_URL)
+        print(f"[부하 테스트] {ES_URL} (bench_parking / bench_commercial 인덱스 사용)")
+
+    rates = [int(r) for r in args.rates.split(",")]
+    _, ceiling = run_load_test(es, rates, step_seconds=args.step_seconds)
+    print(f"지속 가능한 최대 색인 속도: {ceiling} docs/s")
+
+
+def cmd_bench_spatial(args):
+    from spatial import run_scaling_benchmark
+
+    worker_counts = [int(w) for w in args.workers.split(",")]
+    run_scaling_benchmark(args.areas, args.lots, worker_counts, radius_m=args.radius, verify=args.verify)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="cli.py",
+        description="서울시 공영주차장 / 상권 데이터 수집 및 Elasticsearch 업로드",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("status", help="환경 변수와 Elasticsearch 연결 상태 확인")
+    p.add_argument("--profile", action="store_true", help="의존성 import 시간 리포트 출력")
+    p.add_argument("--timeout", type=float, default=2.0, help="Elasticsearch 연결 타임아웃(초)")
+    p.set_defaults(func=cmd_status)
+
+    p = sub.add_parser("fetch", help="데이터 수집만 실행 (업로드 없음)")
+    p.add_argument("target", choices=["parking", "commercial"])
+    p.set_defaults(func=cmd_fetch)
+
+    p = sub.add_parser("upload", help="수집 → 전처리 → 스풀 기록 → Elasticsearch 전송")
+    p.add_argument("target", choices=["parking", "commercial", "all"])
+    p.add_argument("--workers", type=int, default=None, help="상권 반경 검색 프로세스 수 (기본: 1)")
+    p.set_defaults(func=cmd_upload)
+
+    p = sub.add_parser("drain", help="스풀에 남은 문서를 Elasticsearch 로 전송")
+    p.set_defaults(func=cmd_drain)
+
+    p = sub.add_parser("bench", help="성능 측정")
+    bench = p.add_subparsers(dest="target", required=True)
+
+    p = bench.add_parser("imports", help="의존성별 콜드 import 시간 측정")
+    p.set_defaults(func=cmd_bench_imports)
+
+    p = bench.add_parser("ingest", help="합성 문서를 점점 빠르게 보내 색인 처리량 한계 측정")
+    p.add_argument("--fake", action="store_true", help="로컬 가짜 ES 대상으로 실행")
+    p.add_argument("--fake-capacity", type=int, default=5000, help="가짜 ES 처리 용량 (docs/s)")
+    p.add_argument("--rates", default="500,1000,2000,4000,8000,16000", help="단계별 목표 속도 (docs/s)")
+    p.add_argument("--step-seconds", type=int, default=5, help="단계별 실행 시간(초)")
+    p.set_defaults(func=cmd_bench_ingest)
+
+    p = bench.add_parser("spatial", help="합성 전국 데이터로 반경 검색 프로세스 수별 속도 측정")
+    p.add_argument("--areas", type=int, default=2000, help="상권 수")
+    p.add_argument("--lots", type=int, default=30000, help="주차장 수")
+    p.add_argument("--radius", type=int, default=300, help="반경 (m)")
+    p.add_argument("--workers", default="1,2,4,8", help="비교할 프로세스 수 목록")
+    p.add_argument("--verify", type=int, default=2, help="기존 직렬 함수와 비교할 상권 수 (0이면 생략)")
+    p.set_defaults(func=cmd_bench_spatial)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""
+서울시 열린데이터 API 응답 캐시
+
+- 응답 본문의 sha256 해시만 기록 (본문 자체는 저장하지 않음)
+- 압축 전송(Accept-Encoding: gzip) 요청, 서버가 ETag / Last-Modified 를 주면 조건부 요청
+- 본문 해시가 지난번과 같으면 changed=False → 호출하는 쪽에서 JSON 파싱과 이후 처리를 생략
+- 실행마다 304 로 생략된 전송 바이트, 압축 전송으로 줄어든 바이트, 처리를 생략한 본문 크기와 파싱 시간을 따로 리포트
+
+사용 예:
+    cache = ResponseCache("parking")
+    res = cache.get(url, key="GetParkingInfo/1/1000")
+    if res.changed:
+        started = time.perf_counter()
+        rows = json.loads(res.body)
+        cache.record_parse(res.key, time.perf_counter() - started)
+    ...
+    cache.save()  # 업로드까지 성공한 뒤 저장 (실패하면 다음 실행에서 다시 처리)
+"""
+import gzip
+import hashlib
+import json
+import os
+import zlib
+from collections import namedtuple
+
+from utils import STATE_DIR
+
+CACHE_DIR = os.path.join(STATE_DIR, "http_cache")
+
+CachedResponse = namedtuple("CachedResponse", ["key", "status_code", "body", "changed"])
+
+
+def _decode(raw, encoding):
+    encoding = (encoding or "").lower()
+    if encoding == "gzip":
+        return gzip.decompress(raw)
+    if encoding == "deflate":
+        try:
+            return zlib.decompress(raw)
+        except zlib.error:
+            return zlib.decompress(raw, -zlib.MAX_WBITS)
+    return raw
+
+
+class ResponseCache:
+    """
+    Parameters:
+        name (str): 캐시 이름 (fetcher 별로 분리, 예: "parking", "commercial")
+        cache_dir (str): 저장 위치
+    """
+
+    def __init__(self, name, cache_dir=CACHE_DIR):
+        self.dir = os.path.join(cache_dir, name)
+        self.index_path = os.path.join(self.dir, "index.json")
+        self.index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding="utf-8") as f:
+                self.index = json.load(f)
+        self._pending = {}  # 이번 실행에서 바뀐 항목 (save 시 반영)
+
+        self.report = {
+            "requests": 0,
+            "unchanged": 0,
+            "not_modified": 0,
+            "wire_bytes": 0,
+            "body_bytes": 0,
+            "not_modified_bytes": 0,   # 304 로 본문 전송 자체가 생략된 바이트
+            "compression_saved": 0,    # 압축 전송으로 줄어든 바이트 (본문은 모두 받음)
+            "unchanged_bytes": 0,      # 받았지만 해시가 같아 파싱 / 처리를 생략한 본문 바이트
+            "parse_seconds_saved": 0.0,
+        }
+
+    def get(self, url, key, session=None, **kwargs):
+        """
+        url 을 요청하고 지난 실행과 본문이 같은지 확인
+
+        Parameters:
+            url (str): 요청 URL (API 키 포함)
+            key (str): 캐시 키. API 키가 바뀌어도 유지되도록 URL 대신 서비스/범위 등으로 지정
+
+        Returns:
+            CachedResponse: changed=False 이면 지난 실행과 같은 본문
+        """
+        import requests
+
+        http = session or requests
+        entry = self.index.get(key, {})
+
+        headers = {"Accept-Encoding": "gzip, deflate"}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+        res = http.get(url, headers=headers, stream=True, **kwargs)
+        self.report["requests"] += 1
+
+        # 304: 서버가 변경 없음을 알려줌 → 본문 전송 자체가 생략됨
+        if res.status_code == 304 and entry:
+            res.close()
+            self.report["not_modified"] += 1
+            self.report["unchanged"] += 1
+            self.report["not_modified_bytes"] += entry.get("size", 0)
+            self.report["parse_seconds_saved"] += entry.get("parse_seconds", 0.0)
+            return CachedResponse(key, 304, None, False)
+
+        raw = res.raw.read(decode_content=False)
+        body = _decode(raw, res.headers.get("Content-Encoding"))
+        self.report["wire_bytes"] += len(raw)
+        self.report["body_bytes"] += len(body)
+        self.report["compression_saved"] += max(0, len(body) - len(raw))
+
+        if res.status_code != 200:
+            return CachedResponse(key, res.status_code, body, True)
+
+        digest = hashlib.sha256(body).hexdigest()
+        if entry.get("sha256") == digest:
+            self.report["unchanged"] += 1
+            self.report["unchanged_bytes"] += len(body)
+            self.report["parse_seconds_saved"] += entry.get("parse_seconds", 0.0)
+            return CachedResponse(key, 200, body, False)
+
+        self._pending[key] = {
+            **entry,
+            "sha256": digest,
+            "size": len(body),
+            "etag": res.headers.get("ETag"),
+            "last_modified": res.headers.get("Last-Modified"),
+        }
+        return CachedResponse(key, 200, body, True)
+
+    def section_changed(self, key, section, obj):
+        """
+        본문 일부(예: 월 단위로 바뀌는 CMRCL_RSB)만 따로 해시해서 변경 여부 확인
+
+        본문 전체는 바뀌었어도 해당 부분이 같으면 False
+        """
+        digest = hashlib.sha256(
+            json.dumps(obj, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+        entry = self.index.get(key, {})
+        sections = dict(entry.get("sections", {}))
+        if sections.get(section) == digest:
+            return False
+        sections[section] = digest
+        pending = self._pending.setdefault(key, dict(entry))
+        pending["sections"] = sections
+        return True
+
+    def record_parse(self, key, seconds):
+        """파싱에 걸린 시간 기록 (다음 실행에서 변경이 없으면 생략한 시간으로 집계)"""
+        pending = self._pending.setdefault(key, dict(self.index.get(key, {})))
+        pending["parse_seconds"] = seconds
+
+    def save(self):
+        """이번 실행에서 바뀐 항목(해시, ETag 등)을 인덱스에 반영"""
+        if not self._pending:
+            return
+        os.makedirs(self.dir, exist_ok=True)
+        self.index.update(self._pending)
+        self._pending = {}
+
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+
+    def print_report(self, label):
+        r = self.report
+        print(
+            f"[{label} 응답 캐시] 요청 {r['requests']}건 / 변경 없음 {r['unchanged']}건 "
+            f"(304 {r['not_modified']}건) / 전송 {r['wire_bytes']:,} bytes "
+            f"(압축 해제 {r['body_bytes']:,} bytes, 압축으로 절약 {r['compression_saved']:,} bytes) / "
+            f"304 전송 생략 {r['not_modified_bytes']:,} bytes / 처리 생략 본문 {r['unchanged_bytes']:,} bytes / "
+            f"파싱 생략 {r['parse_seconds_saved']:.3f}s"
+        )
@@ -0,0 +1,515 @@
+"""
+Elasticsearch bulk 업로드 제어
+
+- BulkController: bulk 응답 시간, 429(거절) 비율, 요청 크기를 보고 chunk 크기와 동시 요청 수를 조절
+- bulk_index: helpers.bulk 대신 사용하는 적응형 bulk 업로드 함수 (bulk_send: 미리 직렬화한 문서용)
+- FakeElasticsearch: 지연/거절을 흉내내는 로컬 가짜 ES (테스트 및 부하 테스트용)
+- run_load_test: 합성 주차장/상권 문서를 단계적으로 늘려 보내며 지속 가능한 색인 처리량 측정
+"""
+import json
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, datetime
+
+
+class BulkIngestError(Exception):
+    """
+    재시도 후에도 색인에 실패한 문서가 남았을 때 발생
+
+    Attributes:
+        errors (list): 실패한 문서의 bulk 응답 item
+        failed (list): 실패한 문서 {"_index", "_id", "_source"} (errors 와 같은 순서)
+        success (int): 예외 발생 전까지 색인에 성공한 문서 수
+        retryable (bool): 429 재시도 초과 또는 5xx 처럼 다시 보내면 성공할 수 있는 실패인지 여부
+            False 이면 매핑 오류 등 문서 자체의 문제 (4xx)
+    """
+
+    def __init__(self, message, errors, failed=(), success=0, retryable=False):
+        super().__init__(message)
+        self.errors = errors
+        self.failed = list(failed)
+        self.success = success
+        self.retryable = retryable
+
+
+## 1. chunk 크기 / 동시 요청 수 조절
+class BulkController:
+    """
+    bulk 요청 결과를 관찰해 다음 요청의 chunk 크기와 동시 요청 수를 결정
+
+    - 요청 전체가 429 로 거절됨: 동시 요청 수 -1 (chunk 크기 유지), 거절된 동시 요청 수 이상으로는 다시 늘리지 않음
+    - 일부 문서만 429 로 거절됨: chunk 크기 절반, 대기 시간(backoff) 증가
+    - 응답 시간이 목표의 1.5배 초과: chunk 크기 25% 감소
+    - 응답 시간이 목표의 절반 미만: chunk 크기 25% 증가, 연속 3회면 동시 요청 수 +1
+    - chunk 하나의 요청 크기가 max_bytes 를 넘지 않도록 문서당 평균 크기로 상한 설정
+    """
+
+    def __init__(
+        self,
+        chunk_size=500,
+        concurrency=1,
+        min_chunk=50,
+        max_chunk=5000,
+        max_concurrency=4,
+        target_latency=1.0,
+        max_bytes=10 * 1024 * 1024,
+    ):
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+        self.min_chunk = min_chunk
+        self.max_chunk = max_chunk
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+        self.max_bytes = max_bytes
+
+        self.backoff = 0.0
+        self.avg_doc_bytes = None
+        self.concurrency_limit = max_concurrency  # 요청 전체가 거절된 동시 요청 수 - 1
+        self._fast_streak = 0
+        self.stats = {"requests": 0, "docs": 0, "bytes": 0, "rejected": 0, "seconds": 0.0}
+
+        # 여러 bulk_send 호출이 같은 controller 를 동시에 사용할 수 있음 (run_load_test)
+        self.inflight = 0
+        self._lock = threading.Lock()
+
+    def start_request(self):
+        """요청 시작 → 이 요청을 포함한 현재 동시 요청 수 반환"""
+        with self._lock:
+            self.inflight += 1
+            return self.inflight
+
+    def end_request(self):
+        with self._lock:
+            self.inflight -= 1
+
+    def observe(self, latency, docs, nbytes, rejected, request_rejected=False, inflight=None):
+        """
+        bulk 요청 한 번의 결과(응답 시간, 문서 수, 요청 바이트, 429 거절 수)를 반영
+
+        request_rejected: 요청 전체가 429 로 거절된 경우 (동시 요청 과다), inflight 는 그때의 동시 요청 수
+        """
+        with self._lock:
+            self._observe(latency, docs, nbytes, rejected, request_rejected, inflight)
+
+    def _observe(self, latency, docs, nbytes, rejected, request_rejected, inflight):
+        self.stats["requests"] += 1
+        self.stats["docs"] += docs - rejected
+        self.stats["bytes"] += nbytes
+        self.stats["rejected"] += rejected
+        self.stats["seconds"] += latency
+
+        if docs and not request_rejected:
+            doc_bytes = nbytes / docs
+            self.avg_doc_bytes = (
+                doc_bytes if self.avg_doc_bytes is None
+                else 0.8 * self.avg_doc_bytes + 0.2 * doc_bytes
+            )
+
+        if request_rejected:
+            # 노드의 동시 처리 한도 초과 → chunk 크기는 그대로 두고 동시 요청 수부터 줄임
+            inflight = inflight or self.concurrency
+            self.concurrency_limit = max(1, min(self.concurrency_limit, inflight - 1))
+            self.concurrency = min(self.concurrency, self.concurrency_limit)
+            self.backoff = min(max(self.backoff * 2, 0.1), 30.0)
+            self._fast_streak = 0
+        elif rejected:
+            self.chunk_size //= 2
+            self.backoff = min(max(self.backoff * 2, 0.5), 30.0)
+            self._fast_streak = 0
+        elif latency > self.target_latency * 1.5:
+            self.chunk_size = int(self.chunk_size * 0.75)
+            self._fast_streak = 0
+        else:
+            self.backoff = 0.0
+            if latency < self.target_latency * 0.5:
+                self.chunk_size = int(self.chunk_size * 1.25)
+                self._fast_streak += 1
+                if self._fast_streak >= 3 and self.concurrency < self.concurrency_limit:
+                    self.concurrency += 1
+                    self._fast_streak = 0
+
+        max_chunk = self.max_chunk
+        if self.avg_doc_bytes:
+            max_chunk = min(max_chunk, int(self.max_bytes / self.avg_doc_bytes))
+        self.chunk_size = max(self.min_chunk, min(self.chunk_size, max_chunk))
+
+    def throughput(self):
+        """지금까지 성공한 문서 수 / 요청에 걸린 시간 합계 (docs/s)"""
+        if not self.stats["seconds"]:
+            return 0.0
+        return self.stats["docs"] / self.stats["seconds"]
+
+
+## 2. 적응형 bulk 업로드
+def json_default(obj):
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if hasattr(obj, "item"):  # numpy 스칼라
+        return obj.item()
+    raise TypeError(f"JSON 직렬화 불가: {type(obj)}")
+
+
+def _get_dumps(es):
+    """ES 클라이언트의 JSON serializer (numpy / pandas 타입 지원)를 사용, 없으면 표준 json"""
+    try:
+        return es.transport.serializers.get_serializer("application/json").dumps
+    except AttributeError:
+        return lambda obj: json.dumps(
+            obj, default=json_default, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+
+
+def _serialize(es, actions):
+    """_index / _id / _source 형태의 action 을 (action 줄, source 줄) bytes 쌍으로 변환"""
+    dumps = _get_dumps(es)
+    lines = []
+    for action in actions:
+        meta = {"_index": action["_index"]}
+        if action.get("_id") is not None:
+            meta["_id"] = action["_id"]
+        lines.append((dumps({"index": meta}), dumps(action["_source"])))
+    return lines
+
+
+def _decode_pairs(pairs):
+    """(action 줄, source 줄) → {"_index", "_id", "_source"}"""
+    actions = []
+    for meta_line, source_line in pairs:
+        meta = json.loads(meta_line)["index"]
+        actions.append({"_index": meta["_index"], "_id": meta.get("_id"), "_source": json.loads(source_line)})
+    return actions
+
+
+def _is_rejection(exc):
+    """요청 전체가 과부하로 거절된 경우 (429 또는 타임아웃)"""
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "meta", None), "status", None)
+    return status == 429 or type(exc).__name__ in ("ConnectionTimeout", "ReadTimeout")
+
+
+def _send_tracked(es, chunk, controller):
+    """_send_chunk + 요청 시작 시점의 동시 요청 수 (controller 기준, 다른 bulk_send 호출 포함)"""
+    inflight = controller.start_request()
+    try:
+        return _send_chunk(es, chunk) + (inflight,)
+    finally:
+        controller.end_request()
+
+
+def _send_chunk(es, chunk):
+    """
+    chunk 하나를 bulk 요청으로 전송
+
+    Returns:
+        (latency, nbytes, retry, errors, request_rejected):
+            retry 는 429 로 거절되어 다시 보낼 문서들, errors 는 (문서, 응답 item) 목록
+            request_rejected 는 요청 전체가 거절되었는지 여부
+    """
+    operations = [line for pair in chunk for line in pair]
+    nbytes = sum(len(line) + 1 for line in operations)
+
+    started = time.perf_counter()
+    try:
+        resp = es.bulk(operations=operations)
+    except Exception as e:
+        if _is_rejection(e):
+            return time.perf_counter() - started, nbytes, list(chunk), [], True
+        raise
+    latency = time.perf_counter() - started
+
+    retry, errors = [], []
+    if resp.get("errors"):
+        for pair, item in zip(chunk, resp["items"]):
+            result = next(iter(item.values()))
+            status = result.get("status", 200)
+            if status == 429:
+                retry.append(pair)
+            elif status >= 300:
+                errors.append((pair, result))
+    return latency, nbytes, retry, errors, False
+
+
+def bulk_index(es, actions, controller=None, max_retries=5):
+    """
+    helpers.bulk 대체: chunk 크기와 동시 요청 수를 BulkController 가 매 요청마다 조절
+
+    Parameters:
+        es: Elasticsearch 클라이언트 (또는 FakeElasticsearch)
+        actions (list): {"_index", "_id", "_source"} 형태의 문서 목록
+        controller (BulkController): 여러 번 호출하며 상태를 이어가려면 같은 객체를 전달
+        max_retries (int): 429 로 거절된 문서를 다시 보내는 최대 횟수
+
+    Returns:
+        int: 색인 성공 문서 수
+    """
+    return bulk_send(es, _serialize(es, actions), controller, max_retries)
+
+
+def bulk_send(es, pending, controller=None, max_retries=5):
+    """
+    _serialize 로 미리 직렬화한 (action 줄, source 줄) 목록을 전송 (bulk_index 참고)
+
+    Returns:
+        int: 색인 성공 문서 수
+    """
+    controller = controller or BulkController()
+    pending = list(pending)
+    success = 0
+    all_errors, failed = [], []
+    retries = 0
+
+    with ThreadPoolExecutor(max_workers=controller.max_concurrency) as pool:
+        while pending:
+            if controller.backoff:
+                time.sleep(controller.backoff)
+
+            # 이번 회차에 보낼 chunk 들 (동시 요청 수만큼)
+            chunks = []
+            for _ in range(controller.concurrency):
+                if not pending:
+                    break
+                chunks.append(pending[:controller.chunk_size])
+                pending = pending[controller.chunk_size:]
+
+            rejected_any = False
+            for chunk, future in [(c, pool.submit(_send_tracked, es, c, controller)) for c in chunks]:
+                latency, nbytes, retry, errors, request_rejected, inflight = future.result()
+                controller.observe(latency, len(chunk), nbytes, len(retry), request_rejected, inflight)
+                success += len(chunk) - len(retry) - len(errors)
+                for pair, result in errors:
+                    all_errors.append(result)
+                    failed.append(pair)
+                if retry:
+                    rejected_any = True
+                    pending = retry + pending
+
+            if rejected_any:
+                retries += 1
+                if retries > max_retries:
+                    raise BulkIngestError(
+                        f"429 거절이 {max_retries}회 재시도 후에도 계속됨 (남은 문서 {len(pending)}건)",
+                        all_errors,
+                        _decode_pairs(failed),
+                        success,
+                        retryable=True,
+                    )
+            else:
+                retries = 0
+
+    if all_errors:
+        raise BulkIngestError(
+            f"{len(all_errors)}건 색인 실패",
+            all_errors,
+            _decode_pairs(failed),
+            success,
+            retryable=any(result.get("status", 500) >= 500 for result in all_errors),
+        )
+    return success
+
+
+## 3. 테스트용 가짜 Elasticsearch
+class FakeRejection(Exception):
+    """요청 큐가 가득 찼을 때 가짜 ES 가 발생시키는 429 오류"""
+
+    status_code = 429
+
+
+class _FakeIndices:
+    def __init__(self):
+        self.created = {}
+
+    def exists(self, index):
+        return index in self.created
+
+    def create(self, index, body=None, **kwargs):
+        self.created[index] = body or kwargs
+
+    def delete(self, index, **kwargs):
+        self.created.pop(index, None)
+
+
+class FakeElasticsearch:
+    """
+    bulk 요청의 지연과 거절을 흉내내는 가짜 ES
+
+    - 초당 capacity 문서까지 처리 (토큰 버킷, 순간 최대 capacity / 2 문서)
+    - 토큰이 부족하면 초과 문서는 item 단위 429
+    - 동시 요청이 max_inflight 를 넘으면 요청 전체 429
+    - 응답 시간 = base_latency + 문서 수 * per_doc_latency (연결 하나의 처리 속도, 노드 전체 한도는 capacity)
+    """
+
+    def __init__(self, capacity=5000, max_inflight=2, base_latency=0.01, per_doc_latency=0.0001):
+        self.capacity = capacity
+        self.max_inflight = max_inflight
+        self.base_latency = base_latency
+        self.per_doc_latency = per_doc_latency
+        self.indices = _FakeIndices()
+        self.docs = {}
+
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._tokens = capacity / 2
+        self._refilled = time.perf_counter()
+
+    def _take_tokens(self, n):
+        with self._lock:
+            now = time.perf_counter()
+            self._tokens = min(
+                self.capacity / 2, self._tokens + (now - self._refilled) * self.capacity
+            )
+            self._refilled = now
+            accepted = min(n, int(self._tokens))
+            self._tokens -= accepted
+            return accepted
+
+    def bulk(self, operations, **kwargs):
+        with self._lock:
+            self._inflight += 1
+            inflight = self._inflight
+        try:
+            if inflight > self.max_inflight:
+                raise FakeRejection("es_rejected_execution_exception")
+
+            pairs = list(zip(operations[::2], operations[1::2]))
+            accepted = self._take_tokens(len(pairs))
+            latency = self.base_latency + len(pairs) * self.per_doc_latency
+            time.sleep(latency)
+
+            items = []
+            for i, (meta_line, source_line) in enumerate(pairs):
+                meta = json.loads(meta_line)["index"]
+                if i < accepted:
+                    with self._lock:
+                        self.docs[(meta["_index"], meta.get("_id"))] = json.loads(source_line)
+                    items.append({"index": {"_index": meta["_index"], "status": 201}})
+                else:
+                    items.append({"index": {"_index": meta["_index"], "status": 429}})
+            return {"took": int(latency * 1000), "errors": accepted < len(pairs), "items": items}
+        finally:
+            with self._lock:
+                self._inflight -= 1
+
+
+## 4. 부하 테스트
+DISTRICTS = ["강남구", "서초구", "송파구", "마포구", "종로구", "중구", "용산구", "영등포구"]
+
+
+def make_synthetic_docs(n, now=None):
+    """업로드 스크립트와 같은 필드 구성을 가진 합성 주차장 / 상권 문서 생성 (2:1 비율)"""
+    now = now or datetime.now()
+    docs = []
+    for i in range(n):
+        lat = 37.45 + random.random() * 0.2
+        lon = 126.85 + random.random() * 0.3
+        if i % 3 < 2:
+            rate = round(random.random(), 2)
+            docs.append({
+                "_index": "bench_parking",
+                "_id": f"bench_parking_{i}_{now.timestamp()}",
+                "_source": {
+                    "parking_name": f"벤치 주차장 {i}",
+                    "latitude": lat,
+                    "longitude": lon,
+                    "location": {"lat": lat, "lon": lon},
+                    "available_rate": rate,
+                    "is_operating_now": "운영 중",
+                    "hourly_rate": random.choice([600, 1200, 2400, 3000]),
+                    "timestamp": now.isoformat(),
+                    "available_status": "혼잡" if rate < 0.3 else "보통" if rate < 0.7 else "여유",
+                    "district": random.choice(DISTRICTS),
+                    "weekday": "월",
+                    "weekday_order": now.weekday(),
+                },
+            })
+        else:
+            docs.append({
+                "_index": "bench_commercial",
+                "_id": f"bench_commercial_{i}_{now.timestamp()}",
+                "_source": {
+                    "timestamp": now.isoformat(),
+                    "area_name": f"벤치 상권 {i}",
+                    "activity_level": random.choice(["한산한", "보통", "바쁜", "분주한"]),
+                    "payment_count": random.randint(0, 500),
+                    "location": {"lat": lat, "lon": lon},
+                    "parking_count_300m": random.randint(0, 10),
+                },
+            })
+    return docs
+
+
+def run_load_test(es, rates, step_seconds=5, controller=None, ticks_per_second=10):
+    """
+    목표 색인 속도(docs/s)를 단계적으로 올리며 실제 처리량을 측정
+
+    각 단계의 문서는 시간 측정 전에 미리 생성 / 직렬화해 두고 (클라이언트 쪽 비용 제외),
+    1 / ticks_per_second 초마다 rate / ticks_per_second 건씩 bulk 로 보낸다.
+    tick 은 이전 tick 의 응답을 기다리지 않고 보내며, 동시에 진행 중인 요청은 controller.concurrency 개까지
+    (모두 진행 중이면 하나가 끝날 때까지 다음 tick 이 늦어짐 → 목표 속도 미달로 측정)
+    실제 처리량이 목표의 95% 이상이고 거절 비율이 1% 미만이면 지속 가능한 속도로 본다.
+    처음으로 지속 불가능한 단계가 나오면 중단한다.
+
+    Returns:
+        (results, ceiling): 단계별 결과 목록과 지속 가능한 최대 속도 (docs/s)
+    """
+    controller = controller or BulkController()
+    results = []
+    ceiling = 0
+    interval = 1.0 / ticks_per_second
+
+    def send(rate, batch):
+        try:
+            bulk_send(es, batch, controller)
+        except BulkIngestError as e:
+            print(f"  [{rate} docs/s] 색인 실패: {e}")
+
+    with ThreadPoolExecutor(max_workers=controller.max_concurrency) as pool:
+        for rate in rates:
+            per_tick = max(1, rate // ticks_per_second)
+            ticks = step_seconds * ticks_per_second
+            lines = _serialize(es, make_synthetic_docs(per_tick * ticks))
+            batches = [lines[i * per_tick:(i + 1) * per_tick] for i in range(ticks)]
+
+            before = dict(controller.stats)
+            started = time.perf_counter()
+            running = set()
+            for i, batch in enumerate(batches):
+                running = {f for f in running if not f.done()}
+                while len(running) >= controller.concurrency:
+                    _, running = wait(running, return_when=FIRST_COMPLETED)
+                running.add(pool.submit(send, rate, batch))
+
+                # 다음 tick 시각까지 대기 (목표 속도 유지, 밀린 경우 바로 다음 tick)
+                spare = started + (i + 1) * interval - time.perf_counter()
+                if spare > 0:
+                    time.sleep(spare)
+            # 처리량은 마지막 tick 까지의 시간 기준 (클라이언트가 밀리면 여기서 늘어남), 통계는 응답을 모두 받은 뒤 집계
+            elapsed = time.perf_counter() - started
+            wait(running)
+
+            docs = controller.stats["docs"] - before["docs"]
+            rejected = controller.stats["rejected"] - before["rejected"]
+            achieved = docs / elapsed
+            reject_ratio = rejected / max(1, docs + rejected)
+            sustainable = achieved >= per_tick * ticks_per_second * 0.95 and reject_ratio < 0.01
+
+            results.append({
+                "rate": rate,
+                "achieved": achieved,
+                "reject_ratio": reject_ratio,
+                "chunk_size": controller.chunk_size,
+                "concurrency": controller.concurrency,
+                "sustainable": sustainable,
+            })
+            print(
+                f"  목표 {rate:>6} docs/s → 실제 {achieved:8.0f} docs/s / 거절 {reject_ratio:6.1%} "
+                f"/ chunk {controller.chunk_size} x {controller.concurrency} "
+                f"{'OK' if sustainable else '한계 초과'}"
+            )
+            if not sustainable:
+                break
+            ceiling = rate
+
+    return results, ceiling
@@ -0,0 +1,314 @@
+"""
+주차장 정적 정보 레지스트리
+
+GetParkingInfo 응답의 각 행에는 주소, 요금, 운영 시간 같은 정적 정보와
+현재 주차 대수(NOW_PRK_VHCL_CNT) 같은 실시간 정보가 섞여 있다.
+정적 정보는 주차장 ID(PKLT_CD)별로 한 번만 저장하고, 바뀐 주차장만 다시 좌표 변환 / 색인한다.
+매 실행의 처리는 실시간 열만 사용하고, 정적 정보는 정수 인덱스로 레지스트리에서 가져온다.
+
+저장 형식 (state/lot_registry/):
+- CURRENT: 현재 버전 디렉토리 이름
+- v<버전>/<열 이름>.npy: 숫자 열 (np.load(mmap_mode="r") 로 메모리 매핑)
+- v<버전>/strings.json: 문자열 열, 주차장 ID 목록, 정적 정보 해시
+새 버전을 다 쓴 뒤 CURRENT 를 교체하므로 저장 도중 중단되어도 이전 버전이 유지된다.
+"""
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+from utils import STATE_DIR, add_geolocation, get_kr_holidays
+
+REGISTRY_DIR = os.path.join(STATE_DIR, "lot_registry")
+LOTS_INDEX = "seoul_parking_lots"
+
+# 정적 정보 (레지스트리에 저장)
+STRING_COLUMNS = [
+    "PKLT_NM", "ADDR", "PKLT_TYPE", "PRK_STTS_YN",
+    "PAY_YN_NM", "SAT_CHGD_FREE_NM", "LHLDY_CHGD_FREE_SE_NAME",
+]
+NUMERIC_COLUMNS = [
+    "TPKCT", "BSC_PRK_CRG", "BSC_PRK_HR", "ADD_PRK_CRG", "ADD_PRK_HR",
+    "WD_OPER_BGNG_TM", "WD_OPER_END_TM", "WE_OPER_BGNG_TM", "WE_OPER_END_TM",
+    "LHLDY_OPER_BGNG_TM", "LHLDY_OPER_END_TM",
+]
+# 정적 정보에서 계산해 함께 저장하는 열
+DERIVED_NUMERIC = ["latitude", "longitude", "hourly_rate"]
+DERIVED_STRING = ["district"]
+
+# 실시간 정보 (매 실행 처리)
+REALTIME_COLUMNS = ["PKLT_CD", "NOW_PRK_VHCL_CNT", "NOW_PRK_VHCL_UPDT_TM"]
+
+
+def _static_hash(values):
+    return hashlib.sha1("\x1f".join("" if v is None else str(v) for v in values).encode("utf-8")).hexdigest()
+
+
+def extract_district(address):
+    """주소에서 구 이름 추출 (예: "서울특별시 강남구 ..." → "강남구")"""
+    try:
+        return [word for word in address.split() if word.endswith("구")][0]
+    except Exception:
+        return None
+
+
+def _hourly_rate(charge, minutes):
+    """시간당 요금 = (기본 요금 / 기본 시간) * 60"""
+    if np.isnan(charge) or np.isnan(minutes) or minutes <= 0:
+        return np.nan
+    return round(charge / minutes * 60)
+
+
+class LotRegistry:
+    """
+    Parameters:
+        path (str): 레지스트리 디렉토리
+    """
+
+    def __init__(self, path=REGISTRY_DIR):
+        self.path = path
+        self.ids = []
+        self.hashes = []
+        self.strings = {col: [] for col in STRING_COLUMNS + DERIVED_STRING}
+        self.numeric = {col: np.empty(0) for col in NUMERIC_COLUMNS + DERIVED_NUMERIC}
+
+        current_path = os.path.join(path, "CURRENT")
+        if os.path.exists(current_path):
+            with open(current_path, encoding="utf-8") as f:
+                version_dir = os.path.join(path, f.read().strip())
+            with open(os.path.join(version_dir, "strings.json"), encoding="utf-8") as f:
+                stored = json.load(f)
+            self.ids = stored["ids"]
+            self.hashes = stored["hashes"]
+            self.strings.update(stored["columns"])
+            for col in self.numeric:
+                self.numeric[col] = np.load(os.path.join(version_dir, f"{col}.npy"), mmap_mode="r")
+
+        self.index = {lot_id: i for i, lot_id in enumerate(self.ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    ## 1. 갱신
+    def refresh(self, df_raw):
+        """
+        새로 생기거나 정적 정보가 바뀐 주차장만 반영 (좌표 변환도 해당 주차장만)
+
+        응답에 없는 주차장은 삭제하지 않는다. (응답 캐시로 건너뛴 페이지 등)
+        좌표 변환 대상인데 좌표를 얻지 못한 주차장은 해시를 비워 두어 다음 refresh 에서 다시 변환한다.
+        디스크 반영은 save() 에서 한다. (바뀐 주차장 문서를 스풀에 기록한 뒤 호출)
+
+        Returns:
+            list: 바뀐 주차장의 레지스트리 인덱스
+        """
+        import pandas as pd
+
+        static = df_raw[["PKLT_CD"] + STRING_COLUMNS + NUMERIC_COLUMNS].drop_duplicates("PKLT_CD")
+        static = static[static["PKLT_CD"].notnull()]
+
+        hashes = [_static_hash(row) for row in static.itertuples(index=False)]
+        lot_ids = static["PKLT_CD"].astype(str).tolist()
+        changed_rows = [
+            i for i, (lot_id, h) in enumerate(zip(lot_ids, hashes))
+            if lot_id not in self.index or self.hashes[self.index[lot_id]] != h
+        ]
+        if not changed_rows:
+            return []
+
+        changed = static.iloc[changed_rows].copy()
+        for col in NUMERIC_COLUMNS:
+            changed[col] = pd.to_numeric(changed[col], errors="coerce")
+
+        # 주소가 그대로인 기존 주차장은 저장된 좌표 재사용
+        known = [self.index.get(lot_ids[i], -1) for i in changed_rows]
+        changed["latitude"] = [
+            self.numeric["latitude"][p] if p >= 0 and self.strings["ADDR"][p] == addr else np.nan
+            for p, addr in zip(known, changed["ADDR"])
+        ]
+        changed["longitude"] = [
+            self.numeric["longitude"][p] if p >= 0 and self.strings["ADDR"][p] == addr else np.nan
+            for p, addr in zip(known, changed["ADDR"])
+        ]
+
+        # 좌표 변환은 실시간 정보를 제공하는 노상 주차장만 (filter_valid_parking 과 같은 기준)
+        eligible = (
+            (changed["PKLT_TYPE"] == "NW") & (changed["PRK_STTS_YN"] == "1") & changed["latitude"].isnull()
+        )
+        if eligible.any():
+            geo = add_geolocation(changed[eligible])
+            changed.loc[eligible, "latitude"] = pd.to_numeric(geo["latitude"], errors="coerce")
+            changed.loc[eligible, "longitude"] = pd.to_numeric(geo["longitude"], errors="coerce")
+        changed["hourly_rate"] = [
+            _hourly_rate(c, m) for c, m in zip(changed["BSC_PRK_CRG"], changed["BSC_PRK_HR"])
+        ]
+        changed["district"] = changed["ADDR"].apply(extract_district)
+
+        # 좌표 변환에 실패한 주차장(Kakao 장애, 할당량 초과 등)은 해시를 저장하지 않아 다음 실행에서 다시 변환
+        geocode_failed = (
+            (changed["PKLT_TYPE"] == "NW") & (changed["PRK_STTS_YN"] == "1")
+            & (changed["latitude"].isnull() | changed["longitude"].isnull())
+        ).tolist()
+
+        # 메모리 매핑된 배열은 읽기 전용이므로 복사본에 반영 후 새 버전으로 저장
+        numeric = {col: np.array(values, dtype=np.float64) for col, values in self.numeric.items()}
+        new_lots = sum(1 for i in changed_rows if lot_ids[i] not in self.index)
+        for col in numeric:
+            numeric[col] = np.concatenate([numeric[col], np.full(new_lots, np.nan)])
+        for col in self.strings:
+            self.strings[col] = list(self.strings[col]) + [None] * new_lots
+
+        positions = []
+        for row_no, failed, (_, row) in zip(changed_rows, geocode_failed, changed.iterrows()):
+            lot_id = lot_ids[row_no]
+            if lot_id not in self.index:
+                self.index[lot_id] = len(self.ids)
+                self.ids.append(lot_id)
+                self.hashes.append(None)
+            pos = self.index[lot_id]
+            self.hashes[pos] = None if failed else hashes[row_no]
+            for col in numeric:
+                numeric[col][pos] = row[col]
+            for col in self.strings:
+                self.strings[col][pos] = None if pd.isnull(row[col]) else row[col]
+            positions.append(pos)
+
+        self.numeric = numeric
+        print(f"[주차장 레지스트리] 신규/변경 {len(positions)}곳 반영 (전체 {len(self.ids)}곳)")
+        if any(geocode_failed):
+            print(f"[주차장 레지스트리] 좌표 변환 실패 {sum(geocode_failed)}곳은 다음 실행에서 다시 시도")
+        return positions
+
+    def save(self):
+        """새 버전 디렉토리에 저장한 뒤 CURRENT 교체, 이전 버전 삭제"""
+        os.makedirs(self.path, exist_ok=True)
+        versions = sorted(d for d in os.listdir(self.path) if d.startswith("v"))
+        version = f"v{int(versions[-1][1:]) + 1 if versions else 1:06d}"
+        version_dir = os.path.join(self.path, version)
+        os.makedirs(version_dir)
+
+        for col, values in self.numeric.items():
+            np.save(os.path.join(version_dir, f"{col}.npy"), values)
+        with open(os.path.join(version_dir, "strings.json"), "w", encoding="utf-8") as f:
+            json.dump({"ids": self.ids, "hashes": self.hashes, "columns": self.strings}, f, ensure_ascii=False)
+
+        tmp_path = os.path.join(self.path, "CURRENT.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(tmp_path, os.path.join(self.path, "CURRENT"))
+
+        for old in versions:
+            shutil.rmtree(os.path.join(self.path, old), ignore_errors=True)
+
+    ## 2. 조회
+    def lookup(self, lot_ids):
+        """주차장 ID 목록 → 레지스트리 인덱스 배열 (없으면 -1)"""
+        return np.array([self.index.get(str(lot_id), -1) for lot_id in lot_ids], dtype=np.int64)
+
+    def column(self, name, positions):
+        """positions 위치의 정적 정보 열 (숫자 열은 배열, 문자열 열은 리스트)"""
+        if name in self.numeric:
+            return np.asarray(self.numeric[name])[positions]
+        values = self.strings[name]
+        return [values[p] for p in positions]
+
+    def lot_documents(self, positions, index_name=LOTS_INDEX):
+        """정적 정보 문서 (주차장 ID 가 _id 이므로 바뀐 주차장만 다시 보내면 덮어씀)"""
+        actions = []
+        for p in positions:
+            lat, lon = float(self.numeric["latitude"][p]), float(self.numeric["longitude"][p])
+            has_location = not (np.isnan(lat) or np.isnan(lon))
+            num = {col: float(self.numeric[col][p]) for col in NUMERIC_COLUMNS + ["hourly_rate"]}
+            num = {col: (None if np.isnan(v) else v) for col, v in num.items()}
+            actions.append({
+                "_index": index_name,
+                "_id": self.ids[p],
+                "_source": {
+                    "lot_id": self.ids[p],                                      # 주차장 ID (PKLT_CD)
+                    "parking_name": self.strings["PKLT_NM"][p],                 # 주차장명
+                    "address": self.strings["ADDR"][p],                         # 주소
+                    "district": self.strings["district"][p],                    # 구별 주소
+                    "latitude": lat if has_location else None,                  # 위도
+                    "longitude": lon if has_location else None,                 # 경도
+                    "location": {"lat": lat, "lon": lon} if has_location else None,  # geo_point
+                    "total_spaces": num["TPKCT"],                               # 총 주차 면수
+                    "is_paid": self.strings["PAY_YN_NM"][p],                    # 유료 여부
+                    "saturday_free": self.strings["SAT_CHGD_FREE_NM"][p],       # 토요일 무료 여부
+                    "holiday_free": self.strings["LHLDY_CHGD_FREE_SE_NAME"][p], # 공휴일 무료 여부
+                    "basic_charge": num["BSC_PRK_CRG"],                         # 기본 요금 (원)
+                    "basic_time": num["BSC_PRK_HR"],                            # 기본 시간 (분)
+                    "add_charge": num["ADD_PRK_CRG"],                           # 추가 요금 (원)
+                    "add_time": num["ADD_PRK_HR"],                              # 추가 시간 (분)
+                    "hourly_rate": num["hourly_rate"],                          # 시간당 요금 (원/시간)
+                    "weekday_hours": [num["WD_OPER_BGNG_TM"], num["WD_OPER_END_TM"]],       # 평일 운영 시간
+                    "saturday_hours": [num["WE_OPER_BGNG_TM"], num["WE_OPER_END_TM"]],      # 토요일 운영 시간
+                    "holiday_hours": [num["LHLDY_OPER_BGNG_TM"], num["LHLDY_OPER_END_TM"]], # 공휴일 운영 시간
+                },
+            })
+        return actions
+
+
+## 3. 실시간 처리 (정적 정보는 레지스트리 인덱스로 조회)
+def filter_valid_realtime(df_raw, registry):
+    """
+    실시간 열만 남기고 filter_valid_parking 과 같은 조건으로 필터링
+    (노상 & 실시간 제공 & 가용 공간 >= 0 & 오늘 업데이트 & 좌표 있음)
+
+    Returns:
+        pd.DataFrame: PKLT_CD, NOW_PRK_VHCL_CNT, NOW_PRK_VHCL_UPDT_TM, lot_index
+    """
+    import pandas as pd
+    from datetime import datetime
+
+    df = df_raw[REALTIME_COLUMNS].copy()
+    df["PKLT_CD"] = df["PKLT_CD"].astype(str)
+    df["lot_index"] = registry.lookup(df["PKLT_CD"])
+    df = df[df["lot_index"] >= 0]
+
+    df["NOW_PRK_VHCL_CNT"] = pd.to_numeric(df["NOW_PRK_VHCL_CNT"], errors="coerce")
+    df["NOW_PRK_VHCL_UPDT_TM"] = pd.to_datetime(df["NOW_PRK_VHCL_UPDT_TM"], errors="coerce")
+
+    pos = df["lot_index"].to_numpy()
+    total = registry.column("TPKCT", pos)
+    mask = (
+        (np.array(registry.column("PKLT_TYPE", pos), dtype=object) == "NW")
+        & (np.array(registry.column("PRK_STTS_YN", pos), dtype=object) == "1")
+        & ~np.isnan(total)
+        & df["NOW_PRK_VHCL_CNT"].notnull().to_numpy()
+        & ((total - df["NOW_PRK_VHCL_CNT"].to_numpy()) >= 0)
+        & (df["NOW_PRK_VHCL_UPDT_TM"].dt.date == datetime.now().date()).to_numpy()
+        & ~np.isnan(registry.column("latitude", pos))
+        & ~np.isnan(registry.column("longitude", pos))
+    )
+    return df[mask].copy()
+
+
+def compute_realtime_status(df, registry, now=None):
+    """
+    compute_availability_and_status 와 같은 available_rate / is_operating_now 계산
+    (총 면수, 운영 시간은 레지스트리 배열에서 인덱스로 조회)
+    """
+    from datetime import datetime
+
+    now = now or datetime.now()
+    df = df.copy()
+    pos = df["lot_index"].to_numpy()
+
+    total = registry.column("TPKCT", pos)
+    df["available_rate"] = np.round((total - df["NOW_PRK_VHCL_CNT"].to_numpy()) / total, 2)
+
+    # 공휴일 / 평일 / 토요일 / 일요일 운영 시간 선택
+    if now.date() in get_kr_holidays() or now.weekday() == 6:
+        prefix = "LHLDY"
+    elif now.weekday() < 5:
+        prefix = "WD"
+    else:
+        prefix = "WE"
+    start = registry.column(f"{prefix}_OPER_BGNG_TM", pos)
+    end = registry.column(f"{prefix}_OPER_END_TM", pos)
+    now_time = int(now.strftime("%H%M"))
+
+    operating = (start <= now_time) & (now_time <= end)  # 운영 시간이 없으면(NaN) 운영 종료
+    df["is_operating_now"] = np.where(operating, "운영 중", "운영 종료")
+    return df
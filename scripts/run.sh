@@ -7,15 +7,25 @@ VENV_PYTHON=/mnt/c/Users/jisu/Desktop/log_analysis/venv/bin/python
 echo "=== Run start: $(date) ===" >> /mnt/c/Users/jisu/Desktop/log_analysis/logs/cron.log
 
 # 파킹 데이터 업로드
-if $VENV_PYTHON /mnt/c/Users/jisu/Desktop/log_analysis/scripts/upload_parking_data.py >> /mnt/c/Users/jisu/Desktop/log_analysis/logs/parking.log 2>&1; then
+$VENV_PYTHON /mnt/c/Users/jisu/Desktop/log_analysis/scripts/cli.py upload parking >> /mnt/c/Users/jisu/Desktop/log_analysis/logs/parking.log 2>&1
+status=$?
+if [ $status -eq 0 ]; then
     echo "[SUCCESS] parking_data 업로드 완료 ($(date))" >> /mnt/c/Users/jisu/Desktop/log_analysis/logs/cron.log
+elif [ $status -eq 75 ]; then
+    # 수집 데이터는 스풀에 보관됨, Elasticsearch 전송은 다음 실행에서 재시도
+    echo "[PENDING] parking_data 스풀 기록 완료, Elasticsearch 미전송 문서 남음 ($(date))" >> /mnt/c/Users/jisu/Desktop/log_analysis/logs/cron.log
 else
     echo "[ERROR] parking_data 업로드 실패 ($(date))" >> /mnt/c/Users/jisu/Desktop/log_analysis/logs/cron.log
 fi
 
 # 상권 데이터 업로드
-if $VENV_PYTHON /mnt/c/Users/jisu/Desktop/log_analysis/scripts/upload_commercial_data.py >> /mnt/c/Users/jisu/Desktop/log_analysis/logs/commercial.log 2>&1; then
+$VENV_PYTHON /mnt/c/Users/jisu/Desktop/log_analysis/scripts/cli.py upload commercial >> /mnt/c/Users/jisu/Desktop/log_analysis/logs/commercial.log 2>&1
+status=$?
+if [ $status -eq 0 ]; then
     echo "[SUCCESS] commercial_data 업로드 완료 ($(date))" >> /mnt/c/Users/jisu/Desktop/log_analysis/logs/cron.log
+elif [ $status -eq 75 ]; then
+    # 수집 데이터는 스풀에 보관됨, Elasticsearch 전송은 다음 실행에서 재시도
+    echo "[PENDING] commercial_data 스풀 기록 완료, Elasticsearch 미전송 문서 남음 ($(date))" >> /mnt/c/Users/jisu/Desktop/log_analysis/logs/cron.log
 else
     echo "[ERROR] commercial_data 업로드 실패 ($(date))" >> /mnt/c/Users/jisu/Desktop/log_analysis/logs/cron.log
 fi
@@ -0,0 +1,288 @@
+"""
+상권 ↔ 주차장 반경 검색 (타일 분할 + 멀티프로세스)
+
+utils.add_parking_count / upload_commercial_data.add_avg_available_rate 는 모든 상권 x 모든 주차장
+쌍에 대해 geodesic 거리를 계산한다. 여기서는
+
+1. 좌표를 위경도 격자(타일)로 나누고, 상권 타일마다 주변 3x3 타일의 주차장만 후보로 사용
+   (타일 크기 >= 반경에 해당하는 위경도 폭(halo) 이므로 반경 내 주차장은 반드시 후보에 포함)
+2. 후보를 위경도 bbox 로 한 번 더 거른 뒤 같은 geodesic 거리로 최종 판정
+3. 타일 묶음을 프로세스 풀에서 처리 (좌표 배열은 shared memory 로 공유, 작업에는 인덱스만 전달)
+
+최종 판정이 기존 함수와 같은 geodesic <= radius_m 이므로 결과는 직렬 처리와 동일하다.
+"""
+import math
+import os
+
+import numpy as np
+
+LAT_DEG_M = 110_574   # 위도 1도의 최소 길이 (적도, m)
+LON_DEG_M = 111_320   # 적도에서 경도 1도의 길이 (m), 위도 φ 에서는 x cos(φ)
+HALO_MARGIN = 1.05    # 위경도 근사 오차 여유
+
+# 워커 프로세스에서 사용하는 좌표 배열 (shared memory 에 연결)
+_COORDS = None
+_SHM = None
+
+
+## 1. 좌표 추출 / 타일 분할
+def _location_array(df):
+    """location 열({"lat", "lon"} 또는 None)을 (n, 2) 배열로 변환, 좌표가 없으면 NaN"""
+    coords = np.full((len(df), 2), np.nan)
+    for i, loc in enumerate(df["location"]):
+        if loc:
+            coords[i] = (float(loc["lat"]), float(loc["lon"]))
+    return coords
+
+
+def _halo(radius_m, max_abs_lat):
+    """반경 radius_m 이 차지하는 최대 위도/경도 폭 (도)"""
+    halo_lat = radius_m / LAT_DEG_M * HALO_MARGIN
+    edge_lat = min(89.0, max_abs_lat + halo_lat)
+    halo_lon = radius_m / (LON_DEG_M * math.cos(math.radians(edge_lat))) * HALO_MARGIN
+    return halo_lat, halo_lon
+
+
+def _tile_keys(coords, tile_deg):
+    valid = ~np.isnan(coords).any(axis=1)
+    keys = np.floor(coords[valid] / tile_deg).astype(np.int64)
+    return np.flatnonzero(valid), keys
+
+
+def _group_by_tile(indices, keys):
+    tiles = {}
+    for idx, (ty, tx) in zip(indices, keys):
+        tiles.setdefault((int(ty), int(tx)), []).append(idx)
+    return tiles
+
+
+def _build_tasks(area_coords, park_coords, tile_deg, n_tasks):
+    """
+    상권 타일마다 (상권 인덱스, 후보 주차장 인덱스) 작업을 만들고
+    비용(상권 수 x 후보 수)이 비슷하도록 n_tasks 개 묶음으로 분배
+    """
+    area_tiles = _group_by_tile(*_tile_keys(area_coords, tile_deg))
+    park_tiles = _group_by_tile(*_tile_keys(park_coords, tile_deg))
+
+    jobs = []
+    for (ty, tx), area_idx in area_tiles.items():
+        candidates = []
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                candidates.extend(park_tiles.get((ty + dy, tx + dx), []))
+        jobs.append((np.array(area_idx), np.array(sorted(candidates), dtype=np.int64)))
+
+    # 비용이 큰 작업부터 가장 가벼운 묶음에 배정 (LPT)
+    jobs.sort(key=lambda job: -len(job[0]) * max(1, len(job[1])))
+    bins = [[] for _ in range(max(1, min(n_tasks, len(jobs))))]
+    loads = [0] * len(bins)
+    for job in jobs:
+        i = loads.index(min(loads))
+        bins[i].append(job)
+        loads[i] += len(job[0]) * max(1, len(job[1]))
+    return [b for b in bins if b]
+
+
+## 2. 작업 처리 (워커)
+def _attach_shared(name, shape):
+    from multiprocessing import shared_memory
+
+    global _COORDS, _SHM
+    # 해제(unlink)는 부모 프로세스가 담당
+    _SHM = shared_memory.SharedMemory(name=name)
+    _COORDS = np.ndarray(shape, dtype=np.float64, buffer=_SHM.buf)
+
+
+def _join_tiles(jobs, n_areas, radius_m, halo_lat, halo_lon):
+    """
+    Returns:
+        list of (상권 인덱스, 반경 내 주차장 인덱스 배열): 주차장 인덱스는 오름차순 (parking_df 순서)
+    """
+    from geopy.distance import geodesic
+
+    area_coords = _COORDS[:n_areas]
+    park_coords = _COORDS[n_areas:]
+
+    results = []
+    for area_idx, candidates in jobs:
+        cand_coords = park_coords[candidates]
+        for a in area_idx:
+            lat, lon = area_coords[a]
+            near_box = (
+                (np.abs(cand_coords[:, 0] - lat) <= halo_lat)
+                & (np.abs(cand_coords[:, 1] - lon) <= halo_lon)
+            )
+            nearby = [
+                p for p, (plat, plon) in zip(candidates[near_box], cand_coords[near_box])
+                if geodesic((float(lat), float(lon)), (float(plat), float(plon))).meters <= radius_m
+            ]
+            results.append((int(a), np.array(nearby, dtype=np.int64)))
+    return results
+
+
+## 3. 반경 검색
+def find_nearby_parking(summary_df, parking_df, radius_m=300, workers=None, tile_deg=0.05, tasks_per_worker=4):
+    """
+    상권마다 반경 radius_m 이내 주차장의 위치 인덱스(parking_df 기준 iloc) 배열 반환
+
+    Parameters:
+        summary_df (pd.DataFrame): 상권 데이터 (location 포함)
+        parking_df (pd.DataFrame): 주차장 데이터 (location 포함)
+        radius_m (int): 반경 거리 (m)
+        workers (int): 프로세스 수. None 또는 1 이면 현재 프로세스에서 처리
+        tile_deg (float): 타일 크기 (도). 반경에 해당하는 위경도 폭보다 작으면 자동으로 늘린다.
+
+    Returns:
+        list of np.ndarray: summary_df 행 순서, 좌표가 없는 상권은 빈 배열
+    """
+    global _COORDS
+
+    area_coords = _location_array(summary_df)
+    park_coords = _location_array(parking_df)
+    n_areas = len(area_coords)
+    coords = np.vstack([area_coords, park_coords]) if len(park_coords) else area_coords
+
+    max_abs_lat = np.nanmax(np.abs(coords[:, 0])) if not np.isnan(coords[:, 0]).all() else 0.0
+    halo_lat, halo_lon = _halo(radius_m, max_abs_lat)
+    tile_deg = max(tile_deg, halo_lat, halo_lon)
+
+    workers = workers or 1
+    task_groups = _build_tasks(area_coords, park_coords, tile_deg, workers * tasks_per_worker)
+
+    nearby = [np.array([], dtype=np.int64) for _ in range(n_areas)]
+    if workers == 1:
+        _COORDS = coords
+        try:
+            for group in task_groups:
+                for a, idx in _join_tiles(group, n_areas, radius_m, halo_lat, halo_lon):
+                    nearby[a] = idx
+        finally:
+            _COORDS = None
+        return nearby
+
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import shared_memory
+
+    shm = shared_memory.SharedMemory(create=True, size=max(1, coords.nbytes))
+    try:
+        np.ndarray(coords.shape, dtype=np.float64, buffer=shm.buf)[:] = coords
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_attach_shared,
+            initargs=(shm.name, coords.shape),
+        ) as pool:
+            futures = [
+                pool.submit(_join_tiles, group, n_areas, radius_m, halo_lat, halo_lon)
+                for group in task_groups
+            ]
+            for future in futures:
+                for a, idx in future.result():
+                    nearby[a] = idx
+    finally:
+        shm.close()
+        shm.unlink()
+    return nearby
+
+
+def add_parking_stats(summary_df, parking_df, radius_m=300, workers=None):
+    """
+    parking_count_300m, avg_available_rate_300m 열을 한 번의 반경 검색으로 추가
+
+    add_parking_count + add_avg_available_rate 와 같은 결과를 반환한다.
+
+    Parameters:
+        workers (int): 프로세스 수 (기본: 현재 프로세스에서 처리)
+
+    Returns:
+        pd.DataFrame
+    """
+    summary_df = summary_df.copy()
+    nearby = find_nearby_parking(summary_df, parking_df, radius_m=radius_m, workers=workers)
+
+    rates = parking_df["available_rate"] if "available_rate" in parking_df.columns else None
+    avg_rates = []
+    for idx in nearby:
+        if len(idx) and rates is not None:
+            avg_rates.append(rates.iloc[idx].dropna().mean())
+        else:
+            avg_rates.append(None)
+
+    summary_df["parking_count_300m"] = [len(idx) for idx in nearby]
+    summary_df["avg_available_rate_300m"] = avg_rates
+    return summary_df
+
+
+## 4. 확장성 벤치마크
+def make_synthetic_points(n_areas, n_lots, n_clusters=60, seed=0):
+    """
+    전국 규모 합성 데이터: 도시(클러스터) 중심 주변에 상권과 주차장을 분포시킴
+
+    Returns:
+        (summary_df, parking_df)
+    """
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    centers = np.column_stack([rng.uniform(34.8, 37.9, n_clusters), rng.uniform(126.4, 129.4, n_clusters)])
+
+    def scatter(n, spread):
+        c = centers[rng.integers(0, n_clusters, n)]
+        return c + rng.normal(0, spread, (n, 2))
+
+    areas = scatter(n_areas, 0.02)
+    lots = scatter(n_lots, 0.03)
+    summary_df = pd.DataFrame({
+        "area_name": [f"상권 {i}" for i in range(n_areas)],
+        "location": [{"lat": float(lat), "lon": float(lon)} for lat, lon in areas],
+    })
+    parking_df = pd.DataFrame({
+        "location": [{"lat": float(lat), "lon": float(lon)} for lat, lon in lots],
+        "available_rate": np.round(rng.random(n_lots), 2),
+    })
+    summary_df["latitude"] = areas[:, 0]
+    summary_df["longitude"] = areas[:, 1]
+    return summary_df, parking_df
+
+
+def run_scaling_benchmark(n_areas, n_lots, worker_counts, radius_m=300, verify=3):
+    """
+    프로세스 수별 처리 시간 / 속도 향상 측정
+
+    - 모든 프로세스 수의 결과가 서로 같은지 확인
+    - 앞쪽 verify 개 상권은 기존 직렬 함수(add_parking_count, add_avg_available_rate) 결과와도 비교
+    """
+    import time
+
+    summary_df, parking_df = make_synthetic_points(n_areas, n_lots)
+    print(f"[공간 조인 벤치마크] 상권 {n_areas}개 / 주차장 {n_lots}개 / 반경 {radius_m}m / CPU {os.cpu_count()}개")
+
+    baseline = None
+    first_time = None
+    for workers in worker_counts:
+        started = time.perf_counter()
+        result = add_parking_stats(summary_df, parking_df, radius_m=radius_m, workers=workers)
+        elapsed = time.perf_counter() - started
+
+        if baseline is None:
+            baseline, first_time = result, elapsed
+        same = (
+            baseline["parking_count_300m"].tolist() == result["parking_count_300m"].tolist()
+            and baseline["avg_available_rate_300m"].equals(result["avg_available_rate_300m"])
+        )
+        print(
+            f"  workers={workers:<3} {elapsed:8.2f}s  속도 향상 x{first_time / elapsed:5.2f}  "
+            f"결과 일치: {'예' if same else '아니오'}"
+        )
+
+    if verify:
+        from upload_commercial_data import add_avg_available_rate
+        from utils import add_parking_count
+
+        sample = summary_df.head(verify)
+        serial = add_avg_available_rate(add_parking_count(sample, parking_df, radius_m), parking_df, radius_m)
+        tiled = baseline.head(verify)
+        same = (
+            serial["parking_count_300m"].tolist() == tiled["parking_count_300m"].tolist()
+            and serial["avg_available_rate_300m"].equals(tiled["avg_available_rate_300m"])
+        )
+        print(f"  직렬 처리 결과와 일치 (상권 {verify}개): {'예' if same else '아니오'}")
@@ -0,0 +1,306 @@
+"""
+Elasticsearch 전송 전 로컬 스풀 (append-only, gzip NDJSON 세그먼트)
+
+업로드 스크립트는 문서를 먼저 스풀에 기록하고, drainer 가 스풀을 ES 로 전송한다.
+ES 가 꺼져 있거나 느려도 수집한 데이터는 디스크에 남고, 다음 실행에서 이어서 전송한다.
+
+- 세그먼트: seg-<순번>-<문서 수>.ndjson.gz (임시 파일에 쓰고 fsync 후 이름 변경 → 완성된 파일만 보임)
+  순번 선택과 이름 변경은 append.lock 을 잡고 진행 (업로드 스크립트가 동시에 실행되어도 순번이 겹치지 않음)
+- 체크포인트: checkpoint.json {"segment": 순번, "offset": 전송 완료한 줄 수}
+  bulk 전송이 성공할 때마다 갱신하고, 다 보낸 세그먼트는 삭제
+- 문서마다 _id 가 있으므로 체크포인트 직전 배치를 다시 보내도 중복 문서가 생기지 않음
+- 429 / 연결 오류는 체크포인트를 멈추고 다음 실행에서 다시 보낸다.
+  매핑 오류 같은 4xx 문서 오류는 dead-letter.ndjson 에 기록하고 체크포인트를 진행 (한 문서가 스풀 전체를 막지 않도록)
+- 인덱스 매핑은 mappings.json 에 등록해 두고 drainer 가 전송 전에 인덱스를 생성
+"""
+import glob
+import gzip
+import json
+import os
+import time
+
+from ingest import BulkController, BulkIngestError, bulk_index, json_default
+from utils import STATE_DIR
+
+SPOOL_DIR = os.path.join(STATE_DIR, "spool")
+ES_URL = "http://localhost:9200"
+
+SEGMENT_DOCS = 5000   # 세그먼트 하나의 최대 문서 수
+BATCH_DOCS = 5000     # drainer 가 한 번에 bulk_index 로 넘기는 문서 수 (세그먼트를 넘나들며 모음)
+
+
+def _write_json(path, obj):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _parse_segment(path):
+    """seg-000000000001-350.ndjson.gz → (1, 350)"""
+    _, seq, docs = os.path.basename(path).split(".")[0].split("-")
+    return int(seq), int(docs)
+
+
+def _list_segments(path):
+    """완성된 세그먼트 목록 [(순번, 문서 수, 경로)] (순번 오름차순)"""
+    found = []
+    for seg_path in glob.glob(os.path.join(path, "seg-*.ndjson.gz")):
+        seq, docs = _parse_segment(seg_path)
+        found.append((seq, docs, seg_path))
+    return sorted(found)
+
+
+def _read_checkpoint(path):
+    checkpoint_path = os.path.join(path, "checkpoint.json")
+    if not os.path.exists(checkpoint_path):
+        return {"segment": 0, "offset": 0}
+    with open(checkpoint_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_backlog(path=SPOOL_DIR):
+    """
+    스풀 디렉토리를 만들거나 정리하지 않고 남은 문서만 집계 (status 용 읽기 전용 조회)
+
+    Returns:
+        (남은 세그먼트 수, 남은 문서 수, dead-letter 문서 수)
+    """
+    checkpoint = _read_checkpoint(path)
+    segments, docs = 0, 0
+    for seq, n, _ in _list_segments(path):
+        if seq < checkpoint["segment"]:
+            continue
+        segments += 1
+        docs += n - (checkpoint["offset"] if seq == checkpoint["segment"] else 0)
+
+    dead_letters = 0
+    dead_letter_path = os.path.join(path, "dead-letter.ndjson")
+    if os.path.exists(dead_letter_path):
+        with open(dead_letter_path, encoding="utf-8") as f:
+            dead_letters = sum(1 for _ in f)
+    return segments, docs, dead_letters
+
+
+class Spool:
+    """
+    Parameters:
+        path (str): 스풀 디렉토리
+        segment_docs (int): 세그먼트 하나의 최대 문서 수
+    """
+
+    def __init__(self, path=SPOOL_DIR, segment_docs=SEGMENT_DOCS):
+        self.path = path
+        self.segment_docs = segment_docs
+        self.checkpoint_path = os.path.join(path, "checkpoint.json")
+        self.mappings_path = os.path.join(path, "mappings.json")
+        self.dead_letter_path = os.path.join(path, "dead-letter.ndjson")
+        os.makedirs(path, exist_ok=True)
+
+        # 쓰는 도중 중단되어 남은 임시 파일 정리
+        # (다른 업로드가 쓰는 중인 파일은 그 사이 이름이 바뀔 수 있으므로 없어진 파일은 무시)
+        for tmp_path in glob.glob(os.path.join(path, "*.tmp")):
+            try:
+                if time.time() - os.path.getmtime(tmp_path) > 3600:
+                    os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+
+    ## 1. 기록
+    def segments(self):
+        """완성된 세그먼트 목록 [(순번, 문서 수, 경로)] (순번 오름차순)"""
+        return _list_segments(self.path)
+
+    def checkpoint(self):
+        return _read_checkpoint(self.path)
+
+    def register_index(self, index, body):
+        """drainer 가 인덱스를 만들 때 사용할 매핑 등록"""
+        mappings = self.mappings()
+        if mappings.get(index) != body:
+            mappings[index] = body
+            _write_json(self.mappings_path, mappings)
+
+    def mappings(self):
+        if not os.path.exists(self.mappings_path):
+            return {}
+        with open(self.mappings_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def append(self, actions):
+        """
+        {"_index", "_id", "_source"} 문서들을 새 세그먼트로 기록
+
+        Returns:
+            int: 기록한 문서 수
+        """
+        if not actions:
+            return 0
+
+        # 순번 선택부터 이름 변경까지 잠금 (동시에 실행된 업로드가 같은 순번을 쓰지 않도록)
+        with _FileLock(self.path, "append.lock"):
+            existing = [seq for seq, _, _ in self.segments()]
+            seq = max(existing + [self.checkpoint()["segment"]]) + 1
+
+            for start in range(0, len(actions), self.segment_docs):
+                chunk = actions[start:start + self.segment_docs]
+                final_path = os.path.join(self.path, f"seg-{seq:012d}-{len(chunk)}.ndjson.gz")
+                tmp_path = final_path + ".tmp"
+                with open(tmp_path, "wb") as raw:
+                    with gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                        for action in chunk:
+                            line = json.dumps(action, default=json_default, ensure_ascii=False)
+                            f.write(line.encode("utf-8") + b"\n")
+                    raw.flush()
+                    os.fsync(raw.fileno())
+                os.replace(tmp_path, final_path)
+                seq += 1
+
+        return len(actions)
+
+    def backlog(self):
+        """(남은 세그먼트 수, 남은 문서 수)"""
+        segments, docs, _ = read_backlog(self.path)
+        return segments, docs
+
+    ## 2. 전송
+    def _read_pending(self):
+        """체크포인트 이후 문서를 (순번, 줄 번호, action) 순서로 반환"""
+        checkpoint = self.checkpoint()
+        for seq, _, path in self.segments():
+            if seq < checkpoint["segment"]:
+                continue
+            skip = checkpoint["offset"] if seq == checkpoint["segment"] else 0
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line_no, line in enumerate(f):
+                    if line_no < skip:
+                        continue
+                    yield seq, line_no, json.loads(line)
+
+    def _ensure_indices(self, es):
+        for index, body in self.mappings().items():
+            if not es.indices.exists(index=index):
+                es.indices.create(index=index, body=body)
+                print(f"인덱스 '{index}' 생성 완료")
+
+    def _commit(self, seq, line_no):
+        """seq 세그먼트의 line_no 번째 줄까지 전송 완료 → 체크포인트 갱신 후 다 보낸 세그먼트 삭제"""
+        _write_json(self.checkpoint_path, {"segment": seq, "offset": line_no + 1})
+        for s, n, path in self.segments():
+            if s < seq or (s == seq and line_no + 1 >= n):
+                os.remove(path)
+
+    def _dead_letter(self, error):
+        """다시 보내도 실패할 문서(4xx)를 오류 내용과 함께 dead-letter.ndjson 에 추가"""
+        with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+            for action, result in zip(error.failed, error.errors):
+                record = {"failed_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "error": result, "action": action}
+                f.write(json.dumps(record, default=json_default, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        print(f"[스풀] 색인 불가 문서 {len(error.failed)}건 → {self.dead_letter_path}")
+
+    def _ship(self, es, batch, controller):
+        """
+        배치 하나를 전송. 문서 자체의 오류만 남으면 dead-letter 에 기록하고 성공으로 처리
+
+        429 재시도 초과, 5xx, 연결 오류는 예외를 그대로 발생시켜 체크포인트를 멈춘다.
+        """
+        try:
+            return bulk_index(es, batch, controller)
+        except BulkIngestError as e:
+            if e.retryable:
+                raise
+            self._dead_letter(e)
+            return e.success
+
+    def drain(self, es, controller=None, batch_docs=BATCH_DOCS):
+        """
+        체크포인트 이후 문서를 batch_docs 건씩 모아 bulk_index 로 전송
+
+        여러 번의 실행에서 쌓인 작은 세그먼트도 하나의 큰 배치로 묶어 보낸다.
+        전송 중 오류가 나면 마지막으로 성공한 배치까지만 체크포인트에 남고 예외를 다시 발생시킨다.
+        (색인할 수 없는 문서는 dead-letter 로 옮기고 계속 진행)
+
+        Returns:
+            int: 전송한 문서 수
+        """
+        controller = controller or BulkController()
+        with _FileLock(self.path, "drain.lock", blocking=False) as locked:
+            if not locked:
+                print("[스풀] 다른 drainer 가 실행 중이라 건너뜁니다.")
+                return 0
+
+            self._ensure_indices(es)
+            shipped = 0
+            batch, last = [], None
+            for seq, line_no, action in self._read_pending():
+                batch.append(action)
+                last = (seq, line_no)
+                if len(batch) >= batch_docs:
+                    shipped += self._ship(es, batch, controller)
+                    self._commit(*last)
+                    batch = []
+            if batch:
+                shipped += self._ship(es, batch, controller)
+                self._commit(*last)
+            return shipped
+
+
+class _FileLock:
+    """
+    flock 기반 프로세스 간 잠금 (fcntl 이 없는 환경에서는 잠금 없이 진행)
+
+    blocking=False 이면 이미 잠겨 있을 때 기다리지 않고 False 를 반환한다.
+    """
+
+    def __init__(self, path, name, blocking=True):
+        self.lock_path = os.path.join(path, name)
+        self.blocking = blocking
+        self.file = None
+
+    def __enter__(self):
+        try:
+            import fcntl
+        except ImportError:
+            return True
+        self.file = open(self.lock_path, "w")
+        try:
+            fcntl.flock(self.file, fcntl.LOCK_EX if self.blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self.file.close()
+            self.file = None
+            return False
+        return True
+
+    def __exit__(self, *exc):
+        if self.file is not None:
+            self.file.close()
+        return False
+
+
+def drain_spool(spool=None, es=None):
+    """
+    스풀을 ES 로 전송. ES 에 연결할 수 없으면 데이터는 스풀에 남기고 다음 실행에서 이어서 전송
+
+    Returns:
+        int: 전송한 문서 수
+    """
+    spool = spool or Spool()
+    if es is None:
+        from elasticsearch import Elasticsearch
+
+        es = Elasticsearch(ES_URL)
+
+    try:
+        shipped = spool.drain(es)
+    except Exception as e:
+        segments, docs = spool.backlog()
+        print(f"[스풀] Elasticsearch 전송 실패, 스풀에 보관: 세그먼트 {segments}개 / 문서 {docs}건 / {e}")
+        return 0
+
+    segments, docs = spool.backlog()
+    print(f"[스풀] Elasticsearch 전송 완료: {shipped}건 (남은 문서 {docs}건)")
+    return shipped
@@ -0,0 +1,167 @@
+"""
+주차장별 가용률 누적 통계 (주차장 x 요일 x 시간대)
+
+매 실행마다 새로 수집한 데이터만으로 상태를 갱신한다. (과거 이력을 다시 조회하지 않음)
+요일 / 시간대는 수집 시각이 아니라 실시간 정보가 측정된 시각(NOW_PRK_VHCL_UPDT_TM) 기준
+상태는 슬롯별 EWMA 평균, 분산, 표본 수만 저장하므로 갱신 비용은 문서당 O(1)
+
+업로드 문서에 추가되는 필드:
+- expected_rate: 같은 주차장 / 요일 / 시간대의 평소 가용률 (EWMA)
+- anomaly_score: 평소 대비 현재 가용률의 z-score (표본이 부족하면 None)
+- forecast_next_rate: 다음 시간대 예상 가용률
+"""
+import json
+import math
+import os
+
+from utils import STATE_DIR
+
+DEFAULT_PATH = os.path.join(STATE_DIR, "availability_stats.json")
+
+ALPHA = 0.2          # EWMA 가중치 (최근 값 반영 비율)
+MIN_SAMPLES = 4      # anomaly_score 를 계산하기 위한 최소 표본 수
+MIN_STD = 0.05       # 분산이 거의 0일 때 z-score 가 폭주하지 않도록 하는 하한
+PERSISTENCE = 0.5    # 현재 편차가 다음 시간대까지 유지되는 비율
+
+
+def _slot_key(lot, weekday, hour):
+    return f"{lot}|{weekday}|{hour}"
+
+
+def _next_slot(weekday, hour):
+    if hour == 23:
+        return (weekday + 1) % 7, 0
+    return weekday, hour + 1
+
+
+class AvailabilityStats:
+    """
+    슬롯별 {"mean", "var", "n"} 상태 저장소
+
+    Parameters:
+        path (str): 상태 파일 경로 (JSON)
+        alpha (float): EWMA 가중치. 표본이 적을 때는 1/n 을 사용해 단순 평균과 같아진다.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, alpha=ALPHA):
+        self.path = path
+        self.alpha = alpha
+        self.slots = {}
+        self.last_seen = {}  # 주차장별 마지막으로 반영한 실시간 업데이트 시각 (중복 반영 방지)
+
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+            self.slots = state.get("slots", {})
+            self.last_seen = state.get("last_seen", {})
+
+    def get(self, lot, weekday, hour):
+        return self.slots.get(_slot_key(lot, weekday, hour))
+
+    def update(self, lot, weekday, hour, rate, seen_at=None):
+        """
+        관측값 하나를 반영
+
+        seen_at 이 이전에 반영한 값과 같으면 (API 가 아직 갱신되지 않은 경우) 무시한다.
+        """
+        if seen_at is not None:
+            if self.last_seen.get(lot) == seen_at:
+                return False
+            self.last_seen[lot] = seen_at
+
+        key = _slot_key(lot, weekday, hour)
+        slot = self.slots.get(key)
+        if slot is None:
+            self.slots[key] = {"mean": rate, "var": 0.0, "n": 1}
+            return True
+
+        slot["n"] += 1
+        alpha = max(self.alpha, 1 / slot["n"])
+        diff = rate - slot["mean"]
+        incr = alpha * diff
+        slot["mean"] += incr
+        slot["var"] = (1 - alpha) * (slot["var"] + diff * incr)
+        return True
+
+    def expected(self, lot, weekday, hour, rate):
+        """
+        현재 관측값 rate 에 대해 (expected_rate, anomaly_score, forecast_next_rate) 반환
+        """
+        slot = self.get(lot, weekday, hour)
+        expected_rate = anomaly_score = None
+        deviation = 0.0
+        if slot is not None:
+            expected_rate = round(slot["mean"], 4)
+            deviation = rate - slot["mean"]
+            if slot["n"] >= MIN_SAMPLES:
+                std = max(math.sqrt(slot["var"]), MIN_STD)
+                anomaly_score = round(deviation / std, 3)
+
+        # 다음 시간대 평소 가용률 + 현재 편차의 일부, 이력이 없으면 현재 값 유지
+        next_slot = self.get(lot, *_next_slot(weekday, hour))
+        if next_slot is not None:
+            forecast = next_slot["mean"] + PERSISTENCE * deviation
+        else:
+            forecast = rate
+        forecast_next_rate = round(min(1.0, max(0.0, forecast)), 4)
+
+        return expected_rate, anomaly_score, forecast_next_rate
+
+    def save(self):
+        """임시 파일에 쓴 뒤 교체 (저장 중 중단되어도 이전 상태 유지)"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"slots": self.slots, "last_seen": self.last_seen}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def add_availability_stats(df, store):
+    """
+    expected_rate / anomaly_score / forecast_next_rate 열을 추가하고 이번 수집분으로 상태 갱신
+
+    점수는 갱신 전 상태 기준으로 계산한다. (현재 값이 자기 자신의 기준값에 섞이지 않도록)
+    상태 저장(store.save)은 업로드 성공 후 호출한다.
+
+    Parameters:
+        df (pd.DataFrame): available_rate, NOW_PRK_VHCL_UPDT_TM 열이 있는 주차장 데이터
+            (업데이트 시각을 해석할 수 없는 행은 timestamp 기준)
+        store (AvailabilityStats): 상태 저장소
+
+    Returns:
+        pd.DataFrame
+    """
+    import pandas as pd
+
+    df = df.copy()
+
+    lots = df["PKLT_CD"] if "PKLT_CD" in df.columns else df["PKLT_NM"]
+    # 측정 시각 기준 슬롯 (08:05 에 갱신된 값을 14:00 에 수집해도 8시 슬롯에 반영)
+    measured = pd.to_datetime(df["NOW_PRK_VHCL_UPDT_TM"], errors="coerce")
+    weekdays = measured.dt.dayofweek.fillna(df["timestamp"].dt.dayofweek)
+    hours = measured.dt.hour.fillna(df["timestamp"].dt.hour)
+    seen = df["NOW_PRK_VHCL_UPDT_TM"].astype(str)
+
+    expected_rates, anomaly_scores, forecasts = [], [], []
+    for lot, weekday, hour, rate, seen_at in zip(
+        lots.astype(str), weekdays, hours, df["available_rate"], seen
+    ):
+        weekday, hour = int(weekday), int(hour)
+        if rate is None or math.isnan(rate):
+            expected_rates.append(None)
+            anomaly_scores.append(None)
+            forecasts.append(None)
+            continue
+
+        rate = float(rate)
+        expected_rate, anomaly_score, forecast = store.expected(lot, weekday, hour, rate)
+        expected_rates.append(expected_rate)
+        anomaly_scores.append(anomaly_score)
+        forecasts.append(forecast)
+        store.update(lot, weekday, hour, rate, seen_at=seen_at)
+
+    # object 타입으로 두어 값이 없는 문서는 NaN 이 아닌 None(null)으로 업로드
+    df["expected_rate"] = pd.Series(expected_rates, index=df.index, dtype=object)
+    df["anomaly_score"] = pd.Series(anomaly_scores, index=df.index, dtype=object)
+    df["forecast_next_rate"] = pd.Series(forecasts, index=df.index, dtype=object)
+    return df
@@ -1,13 +1,17 @@
 import os
+import numpy as np
 import pandas as pd
 from dotenv import load_dotenv
-from elasticsearch import Elasticsearch, helpers
+from elasticsearch import Elasticsearch
 from utils import (
     fetch_commercial_data,
     add_search_keyword,
     add_geolocation_from_kakao,
-    add_parking_count
 )
+from http_cache import ResponseCache
+from registry import LotRegistry
+from spatial import add_parking_stats
+from spool import Spool, drain_spool
 from geopy.distance import geodesic
 from datetime import datetime
 import pytz
@@ -15,20 +19,22 @@ import pytz
 load_dotenv()
 
 def upload_to_elasticsearch(df, index_name):
-    es = Elasticsearch("http://localhost:9200")
+    """
+    로컬 스풀에 먼저 기록한 뒤 Elasticsearch 로 전송
+    (ES 에 연결할 수 없으면 스풀에 남겨두고 다음 실행에서 이어서 전송)
+    """
+    spool = Spool()
 
-    # 인덱스가 없으면 생성
-    if not es.indices.exists(index=index_name):
-        mapping = {
-            "mappings": {
-                "properties": {}
-            }
+    # 인덱스가 없으면 생성 (전송 시 drainer 가 생성)
+    mapping = {
+        "mappings": {
+            "properties": {}
         }
-        if "location" in df.columns:
-            mapping["mappings"]["properties"]["location"] = {"type": "geo_point"}
+    }
+    if "location" in df.columns:
+        mapping["mappings"]["properties"]["location"] = {"type": "geo_point"}
+    spool.register_index(index_name, mapping)
 
-        es.indices.create(index=index_name, body=mapping)
-        print(f"인덱스 '{index_name}' 생성 완료")
     actions = []
 
     for _, row in df.iterrows():
@@ -48,11 +54,13 @@ def upload_to_elasticsearch(df, index_name):
         })
 
     if actions:
-        helpers.bulk(es, actions)
-        print(f"[{index_name}] Elasticsearch 업로드 완료: {len(actions)}건")
+        spool.append(actions)
+        print(f"[{index_name}] 스풀 기록 완료: {len(actions)}건")
     else:
         print(f"[{index_name}] 업로드할 유효한 데이터가 없습니다.")
 
+    drain_spool(spool)
+
 def get_parking_data_from_elasticsearch():
     """
     Elasticsearch에서 주차장 데이터를 가져오기 위한 함수
@@ -61,7 +69,8 @@ def get_parking_data_from_elasticsearch():
     query = {
         "query": {
             "match_all": {}
-        }
+        },
+        "sort": [{"timestamp": {"order": "desc"}}]   # 최신 문서부터
     }
     
     # Elasticsearch에서 'seoul_parking' 인덱스를 조회하여 주차장 데이터 가져오기
@@ -70,7 +79,29 @@ def get_parking_data_from_elasticsearch():
     # Elasticsearch에서 반환된 데이터를 DataFrame 형식으로 변환
     parking_data = [hit["_source"] for hit in response["hits"]["hits"]]
     parking_df = pd.DataFrame(parking_data)
-    
+
+    # 주차장마다 최신 문서 하나만 사용 (반경 내 주차장 수를 스냅샷 수가 아닌 주차장 수로 집계,
+    # ES 조회 실패 시 사용하는 get_parking_data_from_registry 와 같은 기준)
+    # lot_id 가 없는 이전 형식 문서는 주차장명으로 구분
+    if not parking_df.empty:
+        keys = parking_df["lot_id"] if "lot_id" in parking_df.columns else pd.Series(np.nan, index=parking_df.index)
+        if "parking_name" in parking_df.columns:
+            keys = keys.fillna(parking_df["parking_name"])
+        parking_df = parking_df[~keys.duplicated() | keys.isnull()].reset_index(drop=True)
+
+    # 이력 문서에는 lot_id 만 있으므로 위도/경도는 주차장 레지스트리에서 정수 인덱스로 조회
+    if "lot_id" in parking_df.columns:
+        registry = LotRegistry()
+        pos = registry.lookup(parking_df["lot_id"])
+        known = pos >= 0
+        for col in ("latitude", "longitude"):
+            if col in parking_df.columns:
+                values = np.array(pd.to_numeric(parking_df[col], errors="coerce"), dtype=float)  # 쓰기 가능한 복사본
+            else:
+                values = np.full(len(parking_df), np.nan)
+            values[known] = registry.column(col, pos[known])
+            parking_df[col] = values
+
     # location을 geo_point로 변환
     parking_df["location"] = parking_df.apply(
     lambda row: {
@@ -83,7 +114,28 @@ def get_parking_data_from_elasticsearch():
     
     return parking_df
 
-def add_avg_available_rate(summary_df, parking_df):
+def get_parking_data_from_registry():
+    """
+    Elasticsearch 에 연결할 수 없을 때 사용하는 대체 주차장 데이터
+    (주차장 레지스트리의 좌표만 사용, 가용률 정보는 없음)
+    get_parking_data_from_elasticsearch 와 마찬가지로 주차장당 한 행
+    """
+    registry = LotRegistry()
+    pos = np.arange(len(registry))
+    lat = registry.column("latitude", pos)
+    lon = registry.column("longitude", pos)
+    valid = (
+        (np.array(registry.column("PKLT_TYPE", pos), dtype=object) == "NW")
+        & (np.array(registry.column("PRK_STTS_YN", pos), dtype=object) == "1")
+        & ~np.isnan(lat)
+        & ~np.isnan(lon)
+    )
+    return pd.DataFrame({
+        "lot_id": [registry.ids[p] for p in pos[valid]],
+        "location": [{"lat": float(a), "lon": float(b)} for a, b in zip(lat[valid], lon[valid])],
+    })
+
+def add_avg_available_rate(summary_df, parking_df, radius_m=300):
     avg_rates = []
 
     for _, row in summary_df.iterrows():
@@ -92,7 +144,7 @@ def add_avg_available_rate(summary_df, parking_df):
         # 반경 300m 내 주차장 필터링
         nearby = parking_df[
             parking_df["location"].apply(
-                lambda loc: geodesic(center, (loc["lat"], loc["lon"])).meters <= 300
+                lambda loc: geodesic(center, (loc["lat"], loc["lon"])).meters <= radius_m
             )
         ]
 
@@ -107,11 +159,17 @@ def add_avg_available_rate(summary_df, parking_df):
     summary_df["avg_available_rate_300m"] = avg_rates
     return summary_df
 
-def main():
+def main(workers=None):
     print("서울시 상권 데이터 수집 및 업로드 시작")
 
-    # 1. 원본 데이터 수집
-    summary_df, categories_df = fetch_commercial_data()
+    # 1. 원본 데이터 수집 (지난 실행과 같은 상권 / 업종별 정보는 건너뜀)
+    cache = ResponseCache("commercial")
+    summary_df, categories_df = fetch_commercial_data(cache=cache)
+    cache.print_report("상권")
+    if summary_df.empty:
+        print("변경된 상권 데이터가 없습니다.")
+        drain_spool()  # 이전 실행에서 남은 스풀 문서는 데이터 변경과 관계없이 전송
+        return
 
     # 2. search_keyword 열 추가   
     summary_df = add_search_keyword(summary_df)
@@ -121,10 +179,15 @@ def main():
     summary_df = add_geolocation_from_kakao(summary_df)
 
     # 4. 주차장 데이터 Elasticsearch에서 불러오기
-    parking_df = get_parking_data_from_elasticsearch()
+    #    (ES 에 연결할 수 없으면 레지스트리 좌표로 대체해 수집한 상권 데이터는 스풀에 남김)
+    try:
+        parking_df = get_parking_data_from_elasticsearch()
+    except Exception as e:
+        print(f"Elasticsearch 주차장 데이터 조회 실패, 주차장 레지스트리 좌표로 대체 (평균 가용률 없음) / {e}")
+        parking_df = get_parking_data_from_registry()
 
-    # 5. 주차장 반경 300m 개수 추가
-    summary_df = add_parking_count(summary_df, parking_df)
+    # 5. 주차장 반경 300m 개수 + 평균 주차장 가용률 추가 (타일 분할 반경 검색, workers 개 프로세스)
+    summary_df = add_parking_stats(summary_df, parking_df, workers=workers)
 
     # 6. 데이터 수집 시각 컬럼 추가
     tz = pytz.timezone("Asia/Seoul")
@@ -133,16 +196,16 @@ def main():
     summary_df["timestamp"] = [now_ts] * len(summary_df)
     categories_df["timestamp"] = [now_ts] * len(categories_df)
 
-    # 7. 평균 주차장 가용률 추가
-    summary_df = add_avg_available_rate(summary_df, parking_df)
-
-    # 8. 수치형으로 변환
+    # 7. 수치형으로 변환
     summary_df["payment_count"] = pd.to_numeric(summary_df["payment_count"], errors="coerce")
     categories_df["payment_count"] = pd.to_numeric(categories_df["payment_count"], errors="coerce")
 
-    # 9. Elasticsearch 업로드
+    # 8. Elasticsearch 업로드
     upload_to_elasticsearch(summary_df, index_name="seoul_commercial")
     upload_to_elasticsearch(categories_df, index_name="seoul_commercial_categories")
 
+    # 9. 스풀에 기록된 뒤 응답 캐시 저장
+    cache.save()
+
 if __name__ == "__main__":
     main()
@@ -1,91 +1,127 @@
 import os
 import pandas as pd
 from dotenv import load_dotenv
-from elasticsearch import Elasticsearch, helpers
-from utils import (
-    fetch_parking_data,
-    filter_valid_parking,
-    add_geolocation,
-    compute_availability_and_status,
-)
+from http_cache import ResponseCache
+from spool import Spool, drain_spool
+from registry import LOTS_INDEX, LotRegistry, compute_realtime_status, filter_valid_realtime
+from stats import AvailabilityStats, add_availability_stats
+from utils import fetch_parking_data
 from datetime import datetime 
 import pytz
 
 load_dotenv()
 
+def upload_lots(registry, positions, index_name=LOTS_INDEX):
+    """
+    정적 정보가 새로 생기거나 바뀐 주차장만 주차장 인덱스(seoul_parking_lots)용으로 스풀에 기록
+    """
+    spool = Spool()
+    spool.register_index(index_name, {
+        "mappings": {
+            "properties": {
+                "location": {"type": "geo_point"}
+            }
+        }
+    })
+    spool.append(registry.lot_documents(positions, index_name))
+    print(f"[{index_name}] 스풀 기록 완료: {len(positions)}건")
+
 def upload_to_elasticsearch(df, index_name="seoul_parking"):
     """
-    주어진 DataFrame을 Elasticsearch 인덱스로 bulk 업로드
+    주어진 DataFrame을 로컬 스풀에 먼저 기록한 뒤 Elasticsearch 로 전송
+    (ES 에 연결할 수 없으면 스풀에 남겨두고 다음 실행에서 이어서 전송)
+
+    이력 문서에는 실시간 정보와 주차장 ID(lot_id), Kibana 시각화에 필요한 일부 정적 필드
+    (주차장명, 자치구, 좌표, 시간당 요금)만 저장한다. (Kibana 는 인덱스 간 조인을 할 수 없음)
+    주소 / 요금 상세 / 운영 시간 등 나머지 정적 정보는 seoul_parking_lots 인덱스에서 lot_id 로 조회한다.
     """
-    es = Elasticsearch("http://localhost:9200")
-
-    # 인덱스가 없다면 생성하면서 location 필드를 geo_point로 지정
-    if not es.indices.exists(index=index_name):
-        es.indices.create(
-            index=index_name,
-            body={
-                "mappings": {
-                    "properties": {
-                        "location": {"type": "geo_point"},
-                        "timestamp": {"type": "date"}
-                    }
-                }
+    spool = Spool()
+
+    spool.register_index(index_name, {
+        "mappings": {
+            "properties": {
+                "lot_id": {"type": "keyword"},
+                "parking_name": {"type": "keyword"},
+                "district": {"type": "keyword"},
+                "location": {"type": "geo_point"},
+                "timestamp": {"type": "date"}
             }
-        )
-        print(f"인덱스 '{index_name}' 생성 및 geo_point 매핑 설정 완료")
+        }
+    })
 
     actions = [
     {
         "_index": index_name,
-        "_id": f"{row.get('PKLT_NM')}_{row.get('timestamp')}",
+        "_id": f"{row.get('PKLT_CD')}_{row.get('timestamp')}",
         "_source": {
-            "parking_name": row.get("PKLT_NM"),                       # 주차장명
-            "address": row.get("ADDR"),                               # 주소
-            "latitude": row.get("latitude"),                          # 위도
-            "longitude": row.get("longitude"),                        # 경도
-            "location": row.get("location"),                          # geo_point
+            "lot_id": row.get("PKLT_CD"),                             # 주차장 ID (seoul_parking_lots 의 _id)
+            "parking_name": row.get("PKLT_NM"),                       # 주차장명 (레지스트리에서 복사)
+            "district": row.get("district"),                          # 구별 주소 (예: "강남구")
+            "location": row.get("location"),                          # geo_point (혼잡도 지도용)
+            "hourly_rate": row.get("hourly_rate"),                    # 시간당 요금 (원/시간)
+            "parked_count": row.get("NOW_PRK_VHCL_CNT"),              # 현재 주차 차량 수
             "available_rate": row.get("available_rate"),              # 가용률 = (전체 - 현재 차량 수) / 전체
             "is_operating_now": row.get("is_operating_now"),          # 현재 운영 여부 (운영 중 / 운영 종료)
             "update_time": row.get("NOW_PRK_VHCL_UPDT_TM"),           # 실시간 정보 업데이트 시각
-            "is_paid": row.get("PAY_YN_NM"),                          # 유료 여부 (유료 / 무료)
-            "saturday_free": row.get("SAT_CHGD_FREE_NM"),             # 토요일 무료 여부
-            "holiday_free": row.get("LHLDY_CHGD_FREE_SE_NAME"),       # 공휴일 무료 여부
-            "basic_charge": row.get("BSC_PRK_CRG"),                   # 기본 요금 (원)
-            "basic_time": row.get("BSC_PRK_HR"),                      # 기본 시간 (분)
-            "add_charge": row.get("ADD_PRK_CRG"),                     # 추가 요금 (원)
-            "add_time": row.get("ADD_PRK_HR"),                        # 추가 시간 (분)
-            "hourly_rate": row.get("hourly_rate"),                    # 시간당 요금 (원/시간) = (기본 요금 / 기본 시간) * 60
             "timestamp": row.get("timestamp"),                        # 수집 시각 (스크립트 실행 시점)
             "available_status": row.get("available_status"),          # 혼잡도 상태 (여유 / 보통 / 혼잡 / 정보 없음)
-            "district": row.get("district"),                          # 구별 주소 (예: "강남구")
             "weekday": row.get("weekday"),                            # 요일 (예: "월")
             "weekday_order": row.get("weekday_order"),                # 요일 정렬용 인덱스 (0~6)
+            "expected_rate": row.get("expected_rate"),                # 같은 요일/시간대 평소 가용률 (EWMA)
+            "anomaly_score": row.get("anomaly_score"),                # 평소 대비 현재 가용률 z-score
+            "forecast_next_rate": row.get("forecast_next_rate"),      # 다음 시간대 예상 가용률
         }
     }
     for _, row in df.iterrows()
-    if row.get("location")
 ]
 
     if actions:
-        helpers.bulk(es, actions)
-        print(f"Elasticsearch 업로드 완료: {len(actions)}건")
+        spool.append(actions)
+        print(f"스풀 기록 완료: {len(actions)}건")
     else:
         print("업로드할 유효한 데이터가 없습니다.")
 
+    drain_spool(spool)
+
 def main():
     print("서울시 주차장 데이터 수집 및 업로드 시작")
 
-    # 1. 원본 데이터 수집
-    df_raw = fetch_parking_data()
-
-    # 2. 유효 데이터 필터링
-    df_valid = filter_valid_parking(df_raw)
-
-    # 3. 위도/경도 및 geo_point 생성
-    df_geo = add_geolocation(df_valid)
+    # 1. 원본 데이터 수집 (지난 실행과 같은 페이지는 건너뜀)
+    cache = ResponseCache("parking")
+    df_raw = fetch_parking_data(cache=cache)
+    cache.print_report("주차장")
+    if df_raw.empty:
+        print("변경된 주차장 데이터가 없습니다.")
+        drain_spool()  # 이전 실행에서 남은 스풀 문서는 데이터 변경과 관계없이 전송
+        return
+
+    # 2. 주차장 정적 정보 레지스트리 갱신 (새로 생기거나 바뀐 주차장만 좌표 변환 / 색인)
+    registry = LotRegistry()
+    changed_lots = registry.refresh(df_raw)
+    if changed_lots:
+        upload_lots(registry, changed_lots)
+        registry.save()
+
+    # 3. 실시간 열만 남기고 유효 데이터 필터링 (정적 조건은 레지스트리에서 조회)
+    df_valid = filter_valid_realtime(df_raw, registry)
+    if df_valid.empty:
+        print("업로드할 유효한 데이터가 없습니다.")
+        drain_spool()
+        cache.save()
+        return
 
     # 4. 가용률 + 운영 여부 추가
-    df_status = compute_availability_and_status(df_geo)
+    df_status = compute_realtime_status(df_valid, registry)
+
+    # 4-1. 시각화용 정적 필드를 레지스트리에서 복사 (주차장명, 자치구, 좌표, 시간당 요금)
+    pos = df_status["lot_index"].to_numpy()
+    df_status["PKLT_NM"] = registry.column("PKLT_NM", pos)
+    df_status["district"] = registry.column("district", pos)
+    df_status["hourly_rate"] = [None if pd.isnull(v) else float(v) for v in registry.column("hourly_rate", pos)]
+    df_status["location"] = [
+        {"lat": float(lat), "lon": float(lon)}
+        for lat, lon in zip(registry.column("latitude", pos), registry.column("longitude", pos))
+    ]
 
     # 5. timestamp 열 추가
     tz = pytz.timezone("Asia/Seoul")
@@ -100,19 +136,7 @@ def main():
     # 5-2. 요일 정렬용 컬럼 (요일 순서대로 시각화용 정렬 지원)
     df_status["weekday_order"] = df_status["timestamp"].dt.dayofweek
 
-    # 6. 시간당 요금 계산
-    def calculate_hourly_rate(row):
-        try:
-            if pd.notnull(row["BSC_PRK_CRG"]) and pd.notnull(row["BSC_PRK_HR"]) and row["BSC_PRK_HR"] > 0:
-                return round((row["BSC_PRK_CRG"] / row["BSC_PRK_HR"]) * 60)
-        except Exception:
-            return None
-        return None
-
-    df_status["hourly_rate"] = df_status.apply(calculate_hourly_rate, axis=1)
-
-
-    # 7. 혼잡도 상태 구분 컬럼 추가
+    # 6. 혼잡도 상태 구분 컬럼 추가
     def classify_available_rate(rate):
         if pd.isnull(rate):
             return "정보 없음"
@@ -125,17 +149,14 @@ def main():
 
     df_status["available_status"] = df_status["available_rate"].apply(classify_available_rate)
 
-    # 8. 구별 주소 추출
-    def extract_district(address):
-        try:
-            return [word for word in address.split() if word.endswith("구")][0]
-        except:
-            return None
-
-    df_status["district"] = df_status["ADDR"].apply(extract_district)
+    # 7. 요일 x 시간대 누적 통계 (평소 가용률, 이상치 점수, 다음 시간대 예측)
+    stats_store = AvailabilityStats()
+    df_status = add_availability_stats(df_status, stats_store)
 
-    # 9. Elasticsearch 업로드
+    # 8. 스풀 기록 + Elasticsearch 전송 (스풀에 기록된 뒤 통계 상태 / 응답 캐시 저장)
     upload_to_elasticsearch(df_status)
+    stats_store.save()
+    cache.save()
 
 if __name__ == "__main__":
     main()
@@ -1,23 +1,63 @@
 import os
-import requests
-import pandas as pd
-from dotenv import load_dotenv
 from datetime import datetime
-import holidays
-from geopy.distance import geodesic
-from elasticsearch import Elasticsearch, helpers
+from functools import lru_cache
 
-load_dotenv()
-API_KEY = os.getenv("API_KEY")
-KAKAO_API_KEY = os.getenv("KAKAO_API_KEY")
-headers = {"Authorization": f"KakaoAK {KAKAO_API_KEY}"}
+# pandas, requests, geopy, holidays, dotenv, elasticsearch 는 import 비용이 커서
+# 실제로 사용하는 함수 안에서 불러온다. (cli.py status / --help 가 빠르게 끝나도록)
 
-kr_holidays = holidays.KR()  # 한국 공휴일
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 실행 간 유지되는 상태 파일 (누적 통계 등) 저장 위치
+STATE_DIR = os.getenv("PIPELINE_STATE_DIR", os.path.join(BASE_DIR, "state"))
+
+
+@lru_cache(maxsize=None)
+def load_env():
+    """
+    .env 를 한 번만 읽어 API 키 정보를 반환
+
+    Returns:
+        dict: {"API_KEY": ..., "KAKAO_API_KEY": ...}
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    return {
+        "API_KEY": os.getenv("API_KEY"),
+        "KAKAO_API_KEY": os.getenv("KAKAO_API_KEY"),
+    }
+
+
+def kakao_headers():
+    return {"Authorization": f"KakaoAK {load_env()['KAKAO_API_KEY']}"}
+
+
+@lru_cache(maxsize=None)
+def get_kr_holidays():
+    import holidays
+
+    return holidays.KR()  # 한국 공휴일
 
 
 ## 1. 주차장 데이터 
 # 1-1. 데이터 불러오기
-def fetch_parking_data():
+def fetch_parking_data(cache=None):
+    """
+    서울시 공영주차장 실시간 정보 전체를 페이지(1000건) 단위로 수집
+
+    Parameters:
+        cache (http_cache.ResponseCache): 주어지면 지난 실행과 본문이 같은 페이지는
+            JSON 파싱 없이 건너뛴다. (바뀐 페이지의 행만 반환)
+
+    Returns:
+        pd.DataFrame
+    """
+    import json
+    import time
+    import requests
+    import pandas as pd
+
+    API_KEY = load_env()["API_KEY"]
     BASE_URL = "http://openapi.seoul.go.kr:8088"
     SERVICE = "GetParkingInfo"
     DATA_TYPE = "json"
@@ -33,10 +73,22 @@ def fetch_parking_data():
     for start in range(1, total_count + 1, BATCH_SIZE):
         end = min(start + BATCH_SIZE - 1, total_count)
         url = f"{BASE_URL}/{API_KEY}/{DATA_TYPE}/{SERVICE}/{start}/{end}"
-        res = requests.get(url)
+        key = f"{SERVICE}/{start}/{end}"
+        if cache is not None:
+            res = cache.get(url, key=key)
+            if not res.changed:
+                print(f"변경 없음: {start} ~ {end}")
+                continue
+            body = res.body
+        else:
+            res = requests.get(url)
+            body = res.content
         if res.status_code == 200:
             try:
-                rows = res.json()["GetParkingInfo"]["row"]
+                parse_started = time.perf_counter()
+                rows = json.loads(body)["GetParkingInfo"]["row"]
+                if cache is not None:
+                    cache.record_parse(key, time.perf_counter() - parse_started)
                 all_rows.extend(rows)
                 print(f"수집 완료: {start} ~ {end}")
             except Exception as e:
@@ -50,6 +102,8 @@ def fetch_parking_data():
 
 # 1-2. 노상 & 실시간 데이터 제공 & 가용공간이 음수가 아닌 데이터 필터링 & 실시간 현황이 업데이트 되지 않는 데이터 제거
 def filter_valid_parking(df):
+    import pandas as pd
+
     df = df.copy()
 
     # 숫자형 변환
@@ -79,10 +133,12 @@ def add_geolocation(df):
     - 주소(ADDR)를 기준으로 위도(latitude), 경도(longitude) 컬럼 생성
     - location 컬럼: Elasticsearch의 geo_point 형태 ({ "lat": 위도, "lon": 경도 })
     """
-    from time import sleep
+    import requests
+    import pandas as pd
 
+    headers = kakao_headers()
     df = df.copy()
-    
+
     # 좌표 변환 함수
     def geocode(address):
         url = "https://dapi.kakao.com/v2/local/search/address.json"
@@ -121,6 +177,7 @@ def compute_availability_and_status(df):
     - 운영 시간은 요일(평일, 주말, 공휴일)에 따라 다르게 적용됨
     - 시간 포맷은 'HHMM' (예: 0830, 2130)
     """
+    kr_holidays = get_kr_holidays()
     df = df.copy()
 
     # available_rate 계산
@@ -165,18 +222,26 @@ def compute_availability_and_status(df):
 
 ## 2. 상권 데이터 
 # 2-1. 상권 데이터 불러오기
-def fetch_commercial_data(excel_path: str = None):
+def fetch_commercial_data(excel_path: str = None, cache=None):
     """
     서울시 주요 120개 장소의 상권 실시간 데이터를 API에서 불러와
     summary_df와 categories_df로 반환
 
     Parameters:
         excel_path (str): 상권 이름 목록이 담긴 엑셀 경로
+        cache (http_cache.ResponseCache): 주어지면 본문이 지난 실행과 같은 상권은 건너뛰고,
+            월 단위로 바뀌는 업종별 정보(CMRCL_RSB)는 그 부분이 바뀐 경우에만 포함
 
     Returns:
         summary_df (pd.DataFrame): 상권 요약 정보
         categories_df (pd.DataFrame): 업종별 상세 정보
     """
+    import json
+    import time
+    import requests
+    import pandas as pd
+
+    API_KEY = load_env()["API_KEY"]
 
     if excel_path is None:
         # 이 파일(utils.py)의 상위 디렉토리에 있는 data 폴더를 기준으로 경로 설정
@@ -191,13 +256,25 @@ def fetch_commercial_data(excel_path: str = None):
 
     for area in area_list:
         url = f"http://openapi.seoul.go.kr:8088/{API_KEY}/json/citydata/1/5/{area}"
-        res = requests.get(url)
+        key = f"citydata/{area}"
+        if cache is not None:
+            res = cache.get(url, key=key)
+            if not res.changed:
+                print(f"[변경 없음] {area}")
+                continue
+            body = res.body
+        else:
+            res = requests.get(url)
+            body = res.content
         if res.status_code != 200:
             print(f"[요청 실패] {area}")
             continue
 
         try:
-            commercial_raw = res.json()["CITYDATA"].get("LIVE_CMRCL_STTS")
+            parse_started = time.perf_counter()
+            commercial_raw = json.loads(body)["CITYDATA"].get("LIVE_CMRCL_STTS")
+            if cache is not None:
+                cache.record_parse(key, time.perf_counter() - parse_started)
             if not commercial_raw:
                 print(f"[상권 없음] {area}")
                 continue
@@ -218,8 +295,11 @@ def fetch_commercial_data(excel_path: str = None):
             "max_amount": commercial_raw.get("AREA_SH_PAYMENT_AMT_MAX", "")
         })
 
-        # 업종별 상세 정보
-        for item in commercial_raw.get("CMRCL_RSB", []):
+        # 업종별 상세 정보 (월 단위 데이터라 바뀌지 않았으면 건너뜀)
+        category_items = commercial_raw.get("CMRCL_RSB", [])
+        if cache is not None and not cache.section_changed(key, "CMRCL_RSB", category_items):
+            continue
+        for item in category_items:
             category_rows.append({
                 "timestamp": item.get("RSB_MCT_TIME", ""),
                 "area_name": area,
@@ -231,8 +311,13 @@ def fetch_commercial_data(excel_path: str = None):
                 "stores": item.get("RSB_MCT_CNT", "")
             })
 
-    summary_df = pd.DataFrame(summary_rows)
-    categories_df = pd.DataFrame(category_rows)
+    # 건너뛴 상권 때문에 비어 있어도 열 구성은 유지
+    summary_df = pd.DataFrame(summary_rows, columns=[
+        "timestamp", "area_name", "activity_level", "payment_count", "min_amount", "max_amount"
+    ])
+    categories_df = pd.DataFrame(category_rows, columns=[
+        "timestamp", "area_name", "category", "level", "payment_count", "amount_min", "amount_max", "stores"
+    ])
 
     return summary_df, categories_df
 
@@ -341,6 +426,11 @@ def add_search_keyword(df):
 
 # 2-2. 위도, 경도 열 만들고 좌표 열 만들기
 def add_geolocation_from_kakao(df):
+    import requests
+    import pandas as pd
+
+    headers = kakao_headers()
+
     def geocode(keyword):
         url = "https://dapi.kakao.com/v2/local/search/keyword.json"
         params = {"query": keyword}
@@ -378,6 +468,8 @@ def add_parking_count(summary_df, parking_df, radius_m=300):
     Returns:
         pd.DataFrame: parking_count_300m 열 추가됨
     """
+    from geopy.distance import geodesic
+
     summary_df = summary_df.copy()
     counts = []
 
@@ -401,8 +493,3 @@ def add_parking_count(summary_df, parking_df, radius_m=300):
 
     summary_df["parking_count_300m"] = counts
     return summary_df
-
-
-
-
-
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# scripts/ 의 모듈은 "from utils import ..." 형태로 서로를 불러오므로 경로에 추가
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
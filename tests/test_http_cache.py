@@ -0,0 +1,149 @@
+import gzip
+import hashlib
+import io
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import utils
+from http_cache import ResponseCache
+
+
+class FakeRaw(io.BytesIO):
+    def read(self, *args, decode_content=True):
+        return super().read(*args)
+
+
+class FakeResponse:
+    def __init__(self, body, status_code=200, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.raw = FakeRaw(body)
+
+    def close(self):
+        pass
+
+
+class FakeServer:
+    """URL 별 본문을 gzip 으로 돌려주고, ETag 가 같으면 304 를 주는 가짜 API"""
+
+    def __init__(self, etag=False):
+        self.bodies = {}
+        self.etag = etag
+        self.requests = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.requests.append((url, headers))
+        body = self.bodies[url]
+        tag = f'"{hashlib.md5(body).hexdigest()}"'
+        if self.etag and headers.get("If-None-Match") == tag:
+            return FakeResponse(b"", 304)
+        resp_headers = {"Content-Encoding": "gzip"}
+        if self.etag:
+            resp_headers["ETag"] = tag
+        return FakeResponse(gzip.compress(body), headers=resp_headers)
+
+
+def test_unchanged_page_is_skipped(tmp_path):
+    server = FakeServer()
+    server.bodies["u"] = json.dumps({"rows": list(range(500))}).encode("utf-8")
+
+    cache = ResponseCache("t", cache_dir=str(tmp_path))
+    first = cache.get("u", key="k", session=server)
+    assert first.changed
+    cache.save()
+
+    cache = ResponseCache("t", cache_dir=str(tmp_path))
+    second = cache.get("u", key="k", session=server)
+    assert not second.changed
+    assert cache.report["unchanged"] == 1
+    assert cache.report["unchanged_bytes"] == len(server.bodies["u"])
+    assert cache.report["not_modified_bytes"] == 0
+    # 압축 절약분은 처리 생략과 따로 집계
+    assert cache.report["compression_saved"] == cache.report["body_bytes"] - cache.report["wire_bytes"]
+
+    server.bodies["u"] = b'{"rows": []}'
+    assert cache.get("u", key="k", session=server).changed
+
+
+def test_not_modified_counts_skipped_transfer(tmp_path):
+    server = FakeServer(etag=True)
+    server.bodies["u"] = b'{"rows": [1, 2, 3]}'
+
+    cache = ResponseCache("t", cache_dir=str(tmp_path))
+    cache.get("u", key="k", session=server)
+    cache.save()
+
+    cache = ResponseCache("t", cache_dir=str(tmp_path))
+    res = cache.get("u", key="k", session=server)
+    assert res.status_code == 304 and not res.changed
+    assert cache.report["not_modified_bytes"] == len(server.bodies["u"])
+    assert cache.report["compression_saved"] == 0
+    assert server.requests[-1][1]["If-None-Match"]
+
+
+def test_nothing_is_stored_until_save(tmp_path):
+    server = FakeServer()
+    server.bodies["u"] = b'{"rows": [1]}'
+
+    cache = ResponseCache("t", cache_dir=str(tmp_path))
+    assert cache.get("u", key="k", session=server).changed
+    cache.section_changed("k", "CMRCL_RSB", [1])
+    cache.record_parse("k", 0.5)
+    assert not os.path.exists(tmp_path / "t")
+
+    # save 하지 않고 다시 실행하면 (업로드 실패 등) 같은 페이지를 다시 처리
+    assert ResponseCache("t", cache_dir=str(tmp_path)).get("u", key="k", session=server).changed
+
+    cache.save()
+    assert os.listdir(tmp_path / "t") == ["index.json"]  # 본문은 저장하지 않음
+    assert ResponseCache("t", cache_dir=str(tmp_path)).index["k"]["parse_seconds"] == 0.5
+
+
+def citydata(level, categories):
+    return json.dumps({"CITYDATA": {"LIVE_CMRCL_STTS": {
+        "AREA_CMRCL_LVL": level,
+        "AREA_SH_PAYMENT_CNT": "10",
+        "CMRCL_RSB": [{"RSB_MID_CTGR": c, "RSB_SH_PAYMENT_CNT": "1"} for c in categories],
+    }}}, ensure_ascii=False).encode("utf-8")
+
+
+@pytest.fixture
+def commercial_api(tmp_path, monkeypatch):
+    excel_path = tmp_path / "areas.xlsx"
+    pd.DataFrame({"AREA_NM": ["강남역", "홍대"]}).to_excel(excel_path, index=False)
+
+    server = FakeServer()
+    monkeypatch.setattr(utils, "load_env", lambda: {"API_KEY": "key"})
+    monkeypatch.setattr("requests.get", server.get)
+    return server, str(excel_path)
+
+
+def test_categories_dropped_when_only_live_summary_changes(tmp_path, commercial_api):
+    server, excel_path = commercial_api
+    url = "http://openapi.seoul.go.kr:8088/key/json/citydata/1/5/{}"
+    server.bodies[url.format("강남역")] = citydata("바쁨", ["한식", "카페"])
+    server.bodies[url.format("홍대")] = citydata("보통", ["주점"])
+
+    cache = ResponseCache("commercial", cache_dir=str(tmp_path / "cache"))
+    summary_df, categories_df = utils.fetch_commercial_data(excel_path, cache=cache)
+    assert len(summary_df) == 2 and len(categories_df) == 3
+    cache.save()
+
+    # 강남역: 실시간 요약만 바뀜 → 요약만 포함, 업종별 행은 제외 / 홍대: 변경 없음 → 건너뜀
+    server.bodies[url.format("강남역")] = citydata("붐빔", ["한식", "카페"])
+    cache = ResponseCache("commercial", cache_dir=str(tmp_path / "cache"))
+    summary_df, categories_df = utils.fetch_commercial_data(excel_path, cache=cache)
+    assert summary_df["area_name"].tolist() == ["강남역"]
+    assert summary_df["activity_level"].tolist() == ["붐빔"]
+    assert categories_df.empty
+    assert list(categories_df.columns)[:3] == ["timestamp", "area_name", "category"]
+    cache.save()
+
+    # 업종별 정보가 바뀌면 다시 포함
+    server.bodies[url.format("강남역")] = citydata("붐빔", ["한식", "카페", "편의점"])
+    cache = ResponseCache("commercial", cache_dir=str(tmp_path / "cache"))
+    _, categories_df = utils.fetch_commercial_data(excel_path, cache=cache)
+    assert categories_df["category"].tolist() == ["한식", "카페", "편의점"]
@@ -0,0 +1,36 @@
+from ingest import BulkController, FakeElasticsearch, bulk_index, make_synthetic_docs, run_load_test
+
+
+def test_bulk_index_retries_item_rejections():
+    # 순간 처리량(토큰 500건)보다 큰 chunk → 일부 문서가 item 단위 429
+    es = FakeElasticsearch(capacity=1000, max_inflight=4)
+    controller = BulkController(chunk_size=1000, min_chunk=50)
+    docs = make_synthetic_docs(1500)
+
+    assert bulk_index(es, docs, controller, max_retries=10) == len(docs)
+    assert controller.stats["rejected"] > 0
+    assert controller.chunk_size < 1000
+    assert {(d["_index"], d["_id"]) for d in docs} == set(es.docs)
+
+
+def test_bulk_index_lowers_concurrency_on_request_rejection():
+    # 동시 요청 2개부터 요청 전체가 429 → 동시 요청 수를 1로 줄이고 다시 늘리지 않음
+    es = FakeElasticsearch(capacity=100000, max_inflight=1)
+    controller = BulkController(chunk_size=200, concurrency=2, max_concurrency=4)
+    docs = make_synthetic_docs(3000)
+
+    assert bulk_index(es, docs, controller) == len(docs)
+    assert controller.stats["rejected"] > 0
+    assert controller.concurrency == 1
+    assert controller.concurrency_limit == 1
+    assert len(es.docs) == len(docs)
+
+
+def test_load_test_uses_concurrency_beyond_one_connection():
+    # 연결 하나로는 400건 요청에 약 0.21초 → 약 1900 docs/s 가 한계, 노드 용량은 20000 docs/s
+    es = FakeElasticsearch(capacity=20000, max_inflight=4, per_doc_latency=0.0005)
+    results, ceiling = run_load_test(es, [1000, 4000], step_seconds=3)
+
+    assert ceiling == 4000
+    assert results[-1]["achieved"] > 2000
+    assert results[-1]["concurrency"] > 1
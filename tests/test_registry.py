@@ -0,0 +1,102 @@
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import registry
+from registry import LotRegistry, compute_realtime_status, filter_valid_realtime
+from utils import compute_availability_and_status, filter_valid_parking
+
+
+def make_raw(n=400, seed=0):
+    """GetParkingInfo 응답 형식의 합성 행 (유효 / 무효 조건을 섞음)"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    today = now.strftime("%Y-%m-%d %H:%M:%S")
+    yesterday = (now - timedelta(days=1)).strftime("%Y-%m-%d %H:%M:%S")
+    closed = f"{(now.hour + 2) % 24:02d}00", f"{(now.hour + 2) % 24:02d}30"  # 지금은 운영하지 않는 시간대
+
+    rows = []
+    for i in range(n):
+        total = rng.choice(["10", "50", "120", "", "abc"])
+        hours = rng.choice([("0000", "2400"), closed, ("", "")])
+        rows.append({
+            "PKLT_CD": f"{1000 + i}",
+            "PKLT_NM": f"주차장 {i}",
+            "ADDR": f"서울특별시 {rng.choice(['강남구', '마포구', '종로구'])} 테스트로 {i}",
+            "PKLT_TYPE": rng.choice(["NW", "NW", "NS"]),
+            "PRK_STTS_YN": rng.choice(["1", "1", "0"]),
+            "PAY_YN_NM": "유료",
+            "SAT_CHGD_FREE_NM": "유료",
+            "LHLDY_CHGD_FREE_SE_NAME": "무료",
+            "TPKCT": total,
+            "NOW_PRK_VHCL_CNT": str(rng.randint(0, 130)),
+            "NOW_PRK_VHCL_UPDT_TM": rng.choice([today, today, yesterday]),
+            "BSC_PRK_CRG": "300",
+            "BSC_PRK_HR": "5",
+            "ADD_PRK_CRG": "300",
+            "ADD_PRK_HR": "5",
+            "WD_OPER_BGNG_TM": hours[0], "WD_OPER_END_TM": hours[1],
+            "WE_OPER_BGNG_TM": hours[0], "WE_OPER_END_TM": hours[1],
+            "LHLDY_OPER_BGNG_TM": hours[0], "LHLDY_OPER_END_TM": hours[1],
+        })
+    return pd.DataFrame(rows)
+
+
+def fake_geolocation(df):
+    df = df.copy()
+    df["latitude"] = 37.5
+    df["longitude"] = 127.0
+    return df
+
+
+def test_realtime_path_matches_original_functions(tmp_path, monkeypatch):
+    monkeypatch.setattr(registry, "add_geolocation", fake_geolocation)
+    df_raw = make_raw()
+
+    reg = LotRegistry(str(tmp_path))
+    reg.refresh(df_raw)
+    reg.save()
+    reg = LotRegistry(str(tmp_path))  # 저장 후 다시 열어 메모리 매핑된 배열로 비교
+
+    now = datetime.now()
+    expected = compute_availability_and_status(filter_valid_parking(df_raw)).set_index("PKLT_CD")
+    actual = compute_realtime_status(filter_valid_realtime(df_raw, reg), reg, now=now).set_index("PKLT_CD")
+
+    assert len(expected) > 0
+    assert sorted(actual.index) == sorted(expected.index)
+    actual = actual.loc[expected.index]
+    assert np.allclose(actual["available_rate"], expected["available_rate"], equal_nan=True)
+    assert actual["is_operating_now"].tolist() == expected["is_operating_now"].tolist()
+
+
+def test_failed_geocode_is_retried(tmp_path, monkeypatch):
+    calls = []
+
+    def failing_geolocation(df):
+        calls.append(len(df))
+        df = df.copy()
+        df["latitude"] = None
+        df["longitude"] = None
+        return df
+
+    df_raw = make_raw(20)
+    eligible = ((df_raw["PKLT_TYPE"] == "NW") & (df_raw["PRK_STTS_YN"] == "1")).sum()
+
+    monkeypatch.setattr(registry, "add_geolocation", failing_geolocation)
+    reg = LotRegistry(str(tmp_path))
+    reg.refresh(df_raw)
+    reg.save()
+    assert filter_valid_realtime(df_raw, LotRegistry(str(tmp_path))).empty
+
+    # 다음 실행에서 좌표 변환이 성공하면 해당 주차장이 다시 유효 데이터에 포함
+    monkeypatch.setattr(registry, "add_geolocation", fake_geolocation)
+    reg = LotRegistry(str(tmp_path))
+    assert len(reg.refresh(df_raw)) == eligible
+    reg.save()
+    assert len(filter_valid_realtime(df_raw, LotRegistry(str(tmp_path)))) == len(filter_valid_parking(df_raw))
+
+    # 좌표가 생긴 뒤에는 다시 변환하지 않음
+    assert LotRegistry(str(tmp_path)).refresh(df_raw) == []
+    assert calls == [eligible]
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from spatial import add_parking_stats, make_synthetic_points
+from upload_commercial_data import add_avg_available_rate
+from utils import add_parking_count
+
+
+@pytest.fixture(scope="module")
+def points():
+    # 도시 3곳에 몰아서 배치 → 반경 300m 안에 주차장이 있는 상권이 충분히 생김
+    summary_df, parking_df = make_synthetic_points(30, 300, n_clusters=3, seed=1)
+    no_location = [3, 17, 24]
+    summary_df["location"] = [None if i in no_location else loc for i, loc in enumerate(summary_df["location"])]
+    summary_df.loc[no_location, ["latitude", "longitude"]] = np.nan
+    parking_df.loc[parking_df.index[::7], "available_rate"] = np.nan
+    return summary_df, parking_df, no_location
+
+
+def serial(summary_df, parking_df):
+    """
+    기존 직렬 함수 결과 (좌표가 있는 상권만)
+
+    좌표가 없는 상권은 iterrows 에서 None 이 NaN 으로 바뀌어 기존 함수가 처리하지 못하므로 따로 확인한다.
+    """
+    located = summary_df[summary_df["location"].notnull()].copy()
+    counted = add_parking_count(located, parking_df, 300)
+    rates = add_avg_available_rate(located, parking_df, 300)
+    return counted["parking_count_300m"], rates["avg_available_rate_300m"]
+
+
+@pytest.fixture(scope="module")
+def expected(points):
+    summary_df, parking_df, _ = points
+    return serial(summary_df, parking_df)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_tiled_join_matches_serial(points, expected, workers):
+    summary_df, parking_df, no_location = points
+    counts, rates = expected
+
+    result = add_parking_stats(summary_df, parking_df, radius_m=300, workers=workers)
+
+    assert counts.sum() > 0
+    assert rates.notnull().sum() > 0
+    located = result.loc[counts.index]
+    assert located["parking_count_300m"].tolist() == counts.tolist()
+    assert located["avg_available_rate_300m"].equals(rates)
+    assert result.loc[no_location, "parking_count_300m"].tolist() == [0, 0, 0]
+    assert result.loc[no_location, "avg_available_rate_300m"].isnull().all()
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_empty_parking_df(points, workers):
+    summary_df, _, _ = points
+    empty = pd.DataFrame({"location": [], "available_rate": []})
+    counts, rates = serial(summary_df, empty)
+
+    result = add_parking_stats(summary_df, empty, radius_m=300, workers=workers)
+
+    assert counts.tolist() == [0] * len(counts)
+    assert result["parking_count_300m"].tolist() == [0] * len(summary_df)
+    assert result["avg_available_rate_300m"].isnull().all()
+    assert rates.isnull().all()
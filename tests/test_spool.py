@@ -0,0 +1,114 @@
+import json
+import threading
+from collections import Counter
+
+import pytest
+
+from ingest import BulkController, FakeElasticsearch
+from spool import Spool, read_backlog
+
+
+class RecordingES(FakeElasticsearch):
+    """보낸 _id 를 기록하고, crash_after 번째 bulk 요청 뒤에는 연결 오류를 내는 가짜 ES"""
+
+    def __init__(self, crash_after=None, bad_ids=(), **kwargs):
+        super().__init__(capacity=1_000_000, max_inflight=8, **kwargs)
+        self.crash_after = crash_after
+        self.bad_ids = set(bad_ids)
+        self.sent = Counter()
+        self.calls = 0
+
+    def bulk(self, operations, **kwargs):
+        self.calls += 1
+        if self.crash_after is not None and self.calls > self.crash_after:
+            raise ConnectionError("connection refused")
+        ids = [json.loads(meta)["index"]["_id"] for meta in operations[::2]]
+        self.sent.update(ids)
+        resp = super().bulk(operations, **kwargs)
+        for i, _id in enumerate(ids):
+            if _id in self.bad_ids:
+                self.docs.pop(("t", _id), None)
+                resp["items"][i] = {"index": {"_index": "t", "_id": _id, "status": 400,
+                                              "error": {"type": "mapper_parsing_exception"}}}
+                resp["errors"] = True
+        return resp
+
+
+def make_actions(n, prefix):
+    return [{"_index": "t", "_id": f"{prefix}-{i}", "_source": {"i": i}} for i in range(n)]
+
+
+def test_drain_resumes_after_crash_without_duplicates_or_gaps(tmp_path):
+    spool = Spool(str(tmp_path), segment_docs=400)
+    actions = make_actions(1000, "a") + make_actions(700, "b")
+    spool.append(actions[:1000])
+    spool.append(actions[1000:])
+
+    # 배치 500건, chunk 500건 → bulk 요청 1회 = 배치 1개. 세 번째 요청에서 중단
+    crashed = RecordingES(crash_after=2)
+    with pytest.raises(ConnectionError):
+        spool.drain(crashed, BulkController(chunk_size=500, min_chunk=500), batch_docs=500)
+    assert spool.backlog()[1] == 700
+
+    resumed = RecordingES()
+    assert spool.drain(resumed, BulkController(chunk_size=500, min_chunk=500), batch_docs=500) == 700
+
+    all_ids = {a["_id"] for a in actions}
+    assert set(crashed.sent) | set(resumed.sent) == all_ids
+    assert not set(crashed.sent) & set(resumed.sent)  # 체크포인트 이전 문서는 다시 보내지 않음
+    assert max((crashed.sent + resumed.sent).values()) == 1
+    assert spool.backlog() == (0, 0)
+    assert spool.segments() == []
+
+
+def test_drain_moves_rejected_documents_to_dead_letter(tmp_path):
+    spool = Spool(str(tmp_path))
+    es = RecordingES(bad_ids={"a-3"})
+    for run in range(3):
+        spool.append(make_actions(5, "a") if run == 0 else make_actions(5, f"r{run}"))
+        spool.drain(es)
+        assert spool.backlog() == (0, 0)
+
+    assert read_backlog(str(tmp_path)) == (0, 0, 1)
+    with open(spool.dead_letter_path, encoding="utf-8") as f:
+        record = json.loads(f.readline())
+    assert record["action"]["_id"] == "a-3"
+    assert record["error"]["status"] == 400
+    assert len(es.docs) == 14
+
+
+def test_concurrent_appenders_get_distinct_segments(tmp_path):
+    spool = Spool(str(tmp_path))
+    barrier = threading.Barrier(4)
+
+    def append(prefix):
+        barrier.wait()
+        for run in range(5):
+            # 같은 길이의 chunk 도 섞어 파일 이름이 겹치면 덮어쓰기가 드러나도록
+            Spool(str(tmp_path)).append(make_actions(100 if run % 2 else 50, f"{prefix}{run}"))
+
+    threads = [threading.Thread(target=append, args=(p,)) for p in "wxyz"]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    seqs = [seq for seq, _, _ in spool.segments()]
+    assert len(seqs) == len(set(seqs)) == 20
+    assert spool.backlog()[1] == 4 * (100 * 2 + 50 * 3)
+
+    # 배치 하나씩 끊어서 보내도 (체크포인트 경계가 세그먼트 중간) 모든 문서가 전송됨
+    es = RecordingES()
+    while spool.backlog()[1]:
+        es.crash_after = es.calls + 1
+        try:
+            spool.drain(es, batch_docs=70)
+        except ConnectionError:
+            pass
+    assert sum(es.sent.values()) == len(es.sent) == 4 * (100 * 2 + 50 * 3)
+
+
+def test_read_backlog_does_not_create_spool_dir(tmp_path):
+    path = tmp_path / "missing"
+    assert read_backlog(str(path)) == (0, 0, 0)
+    assert not path.exists()
@@ -0,0 +1,93 @@
+import pandas as pd
+import pytest
+
+from stats import MIN_SAMPLES, AvailabilityStats, _next_slot, add_availability_stats
+
+
+@pytest.fixture
+def store(tmp_path):
+    return AvailabilityStats(str(tmp_path / "stats.json"))
+
+
+def test_ewma_mean_and_variance(store):
+    # alpha = max(0.2, 1/n): 처음 몇 개는 단순 평균과 같고 이후 EWMA
+    expected = [
+        (0.2, 0.2, 0.0),        # n=1: 첫 값
+        (0.4, 0.3, 0.01),       # n=2: alpha=1/2, diff=0.2
+        (0.6, 0.4, 0.04 * 2 / 3),  # n=3: alpha=1/3, diff=0.3
+        (0.4, 0.4, 0.02),       # n=4: alpha=1/4, diff=0
+        (0.9, 0.5, 0.056),      # n=5: alpha=0.2, diff=0.5
+    ]
+    for n, (rate, mean, var) in enumerate(expected, start=1):
+        assert store.update("A", 0, 8, rate)
+        slot = store.get("A", 0, 8)
+        assert slot["n"] == n
+        assert slot["mean"] == pytest.approx(mean)
+        assert slot["var"] == pytest.approx(var)
+
+
+def test_same_update_time_is_counted_once(store):
+    assert store.update("A", 0, 8, 0.5, seen_at="2026-10-19 08:05:00")
+    assert not store.update("A", 0, 8, 0.1, seen_at="2026-10-19 08:05:00")
+    assert store.get("A", 0, 8) == {"mean": 0.5, "var": 0.0, "n": 1}
+
+    assert store.update("A", 0, 8, 0.1, seen_at="2026-10-19 08:35:00")
+    assert store.get("A", 0, 8)["n"] == 2
+
+
+def test_next_slot_rolls_over_to_next_day():
+    assert _next_slot(2, 5) == (2, 6)
+    assert _next_slot(2, 23) == (3, 0)
+    assert _next_slot(6, 23) == (0, 0)
+
+
+def test_anomaly_score_needs_min_samples(store):
+    for rate in (0.2, 0.4, 0.6):
+        store.update("A", 0, 8, rate)
+    assert MIN_SAMPLES == 4
+    expected_rate, anomaly_score, _ = store.expected("A", 0, 8, 0.7)
+    assert expected_rate == pytest.approx(0.4)
+    assert anomaly_score is None
+
+    store.update("A", 0, 8, 0.4)  # mean 0.4, var 0.02 → std 0.1414
+    _, anomaly_score, _ = store.expected("A", 0, 8, 0.7)
+    assert anomaly_score == pytest.approx(2.121)
+
+
+def test_forecast_uses_next_slot_and_clips(store):
+    # 다음 시간대 이력이 없으면 현재 값 유지
+    assert store.expected("A", 6, 23, 0.3)[2] == 0.3
+
+    store.update("A", 6, 23, 0.5)
+    store.update("A", 0, 0, 0.9)  # 월요일 0시 (일요일 23시의 다음 시간대)
+    # 0.9 + 0.5 * (0.8 - 0.5) = 1.05 → 1.0
+    assert store.expected("A", 6, 23, 0.8)[2] == 1.0
+    # 0.9 + 0.5 * (0.3 - 0.5) = 0.8
+    assert store.expected("A", 6, 23, 0.3)[2] == pytest.approx(0.8)
+
+
+def test_slots_use_measurement_time_and_persist(store):
+    collected = pd.Timestamp("2026-10-19 14:00", tz="Asia/Seoul")  # 월요일
+    df = pd.DataFrame({
+        "PKLT_CD": ["A", "B"],
+        "available_rate": [0.5, float("nan")],
+        "NOW_PRK_VHCL_UPDT_TM": ["2026-10-19 08:05:00", "2026-10-19 13:55:00"],
+        "timestamp": [collected, collected],
+    })
+
+    out = add_availability_stats(df, store)
+    assert store.get("A", 0, 8)["n"] == 1  # 수집 시각(14시)이 아니라 업데이트 시각(8시) 슬롯
+    assert store.get("A", 0, 14) is None
+    assert store.get("B", 0, 13) is None  # 가용률이 없는 행은 반영하지 않음
+    assert out["expected_rate"].tolist() == [None, None]
+    assert out["forecast_next_rate"].tolist() == [0.5, None]
+
+    # 같은 업데이트 시각이 다시 수집되면 점수만 계산하고 상태는 그대로
+    out = add_availability_stats(df, store)
+    assert out["expected_rate"].tolist()[0] == 0.5
+    assert store.get("A", 0, 8)["n"] == 1
+
+    store.save()
+    reloaded = AvailabilityStats(store.path)
+    assert reloaded.slots == store.slots
+    assert reloaded.last_seen == store.last_seen